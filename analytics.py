@@ -0,0 +1,261 @@
+import json
+
+from agno.utils.log import logger
+
+# Raw results plus three aggregate tables kept up to date by the same statement that
+# stores a result, so dashboards read a handful of pre-summed rows instead of scanning
+# every interview. IDs are stored as text, since the user/college/department ID types
+# belong to the main schema. The advisory lock (held until the statements commit)
+# keeps workers that start at the same time from racing on CREATE ... IF NOT EXISTS.
+SCHEMA = """
+SELECT pg_advisory_xact_lock(hashtext('interview_results_schema'));
+
+CREATE TABLE IF NOT EXISTS interview_results (
+    id BIGSERIAL PRIMARY KEY,
+    analysis_key TEXT NOT NULL UNIQUE,
+    stud_id TEXT NOT NULL,
+    college_id TEXT NOT NULL,
+    department_id TEXT NOT NULL,
+    question TEXT NOT NULL,
+    clarity REAL NOT NULL,
+    structure REAL NOT NULL,
+    confidence REAL NOT NULL,
+    relevance REAL NOT NULL,
+    communication REAL NOT NULL,
+    overall_rating REAL NOT NULL,
+    feedback JSONB NOT NULL,
+    created_at TIMESTAMPTZ NOT NULL DEFAULT now()
+);
+CREATE INDEX IF NOT EXISTS interview_results_student ON interview_results (stud_id, created_at);
+CREATE INDEX IF NOT EXISTS interview_results_cohort ON interview_results (college_id, department_id, created_at);
+
+CREATE TABLE IF NOT EXISTS cohort_score_totals (
+    college_id TEXT NOT NULL,
+    department_id TEXT NOT NULL,
+    college_name TEXT NOT NULL,
+    department_name TEXT NOT NULL,
+    interviews BIGINT NOT NULL,
+    sum_clarity DOUBLE PRECISION NOT NULL,
+    sum_structure DOUBLE PRECISION NOT NULL,
+    sum_confidence DOUBLE PRECISION NOT NULL,
+    sum_relevance DOUBLE PRECISION NOT NULL,
+    sum_communication DOUBLE PRECISION NOT NULL,
+    sum_overall DOUBLE PRECISION NOT NULL,
+    PRIMARY KEY (college_id, department_id)
+);
+
+CREATE TABLE IF NOT EXISTS score_histogram (
+    college_id TEXT NOT NULL,
+    department_id TEXT NOT NULL,
+    bucket SMALLINT NOT NULL,
+    interviews BIGINT NOT NULL,
+    PRIMARY KEY (college_id, department_id, bucket)
+);
+
+CREATE TABLE IF NOT EXISTS student_progress (
+    stud_id TEXT PRIMARY KEY,
+    college_id TEXT NOT NULL,
+    department_id TEXT NOT NULL,
+    full_name TEXT NOT NULL,
+    interviews INTEGER NOT NULL,
+    first_overall REAL NOT NULL,
+    latest_overall REAL NOT NULL,
+    best_overall REAL NOT NULL,
+    first_at TIMESTAMPTZ NOT NULL,
+    latest_at TIMESTAMPTZ NOT NULL,
+    improvement REAL GENERATED ALWAYS AS (latest_overall - first_overall) STORED
+);
+CREATE INDEX IF NOT EXISTS student_progress_improvement ON student_progress (improvement DESC) WHERE interviews > 1;
+CREATE INDEX IF NOT EXISTS student_progress_college_improvement
+    ON student_progress (college_id, improvement DESC) WHERE interviews > 1;
+"""
+
+# Stores one result, resolving college and department with the same join as the
+# student lookup, and folds it into the aggregates. A repeated analysis_key (the
+# same analysis stored twice) changes nothing.
+RECORD_RESULT_QUERY = """
+    WITH student AS (
+        SELECT
+            u.id::text AS stud_id,
+            u.first_name || ' ' || u.last_name AS full_name,
+            c.id::text AS college_id,
+            c.name AS college_name,
+            d.id::text AS department_id,
+            d.name AS department_name
+        FROM
+            public.user u, public.college c, public.department d
+        where
+            u.college_id = c.id  and u.college_id = d.id  and u.id = $1
+    ),
+    inserted AS (
+        INSERT INTO interview_results (
+            analysis_key, stud_id, college_id, department_id, question,
+            clarity, structure, confidence, relevance, communication, overall_rating, feedback
+        )
+        SELECT
+            $2::text, stud_id, college_id, department_id, $3::text,
+            $4::real, $5::real, $6::real, $7::real, $8::real, $9::real, $10::jsonb
+        FROM student
+        ON CONFLICT (analysis_key) DO NOTHING
+        RETURNING *
+    ),
+    totals AS (
+        INSERT INTO cohort_score_totals AS t
+        SELECT i.college_id, i.department_id, s.college_name, s.department_name, 1,
+               i.clarity, i.structure, i.confidence, i.relevance, i.communication, i.overall_rating
+        FROM inserted i, student s
+        ON CONFLICT (college_id, department_id) DO UPDATE SET
+            college_name = EXCLUDED.college_name,
+            department_name = EXCLUDED.department_name,
+            interviews = t.interviews + 1,
+            sum_clarity = t.sum_clarity + EXCLUDED.sum_clarity,
+            sum_structure = t.sum_structure + EXCLUDED.sum_structure,
+            sum_confidence = t.sum_confidence + EXCLUDED.sum_confidence,
+            sum_relevance = t.sum_relevance + EXCLUDED.sum_relevance,
+            sum_communication = t.sum_communication + EXCLUDED.sum_communication,
+            sum_overall = t.sum_overall + EXCLUDED.sum_overall
+    ),
+    histogram AS (
+        INSERT INTO score_histogram AS h
+        SELECT college_id, department_id, LEAST(GREATEST(FLOOR(overall_rating), 0), 10)::smallint, 1
+        FROM inserted
+        ON CONFLICT (college_id, department_id, bucket) DO UPDATE SET interviews = h.interviews + 1
+    )
+    INSERT INTO student_progress AS p (
+        stud_id, college_id, department_id, full_name, interviews,
+        first_overall, latest_overall, best_overall, first_at, latest_at
+    )
+    SELECT i.stud_id, i.college_id, i.department_id, s.full_name, 1,
+           i.overall_rating, i.overall_rating, i.overall_rating, i.created_at, i.created_at
+    FROM inserted i, student s
+    ON CONFLICT (stud_id) DO UPDATE SET
+        college_id = EXCLUDED.college_id,
+        department_id = EXCLUDED.department_id,
+        full_name = EXCLUDED.full_name,
+        interviews = p.interviews + 1,
+        latest_overall = EXCLUDED.latest_overall,
+        best_overall = GREATEST(p.best_overall, EXCLUDED.best_overall),
+        latest_at = EXCLUDED.latest_at
+    RETURNING stud_id
+"""
+
+COLLEGE_AVERAGES_QUERY = """
+    SELECT
+        college_id,
+        MAX(college_name) AS college_name,
+        SUM(interviews)::bigint AS interviews,
+        SUM(sum_clarity) / SUM(interviews) AS clarity,
+        SUM(sum_structure) / SUM(interviews) AS structure,
+        SUM(sum_confidence) / SUM(interviews) AS confidence,
+        SUM(sum_relevance) / SUM(interviews) AS relevance,
+        SUM(sum_communication) / SUM(interviews) AS communication,
+        SUM(sum_overall) / SUM(interviews) AS overall_rating
+    FROM cohort_score_totals
+    GROUP BY college_id
+    ORDER BY overall_rating DESC
+"""
+
+DEPARTMENT_AVERAGES_QUERY = """
+    SELECT
+        department_id,
+        department_name,
+        interviews,
+        sum_clarity / interviews AS clarity,
+        sum_structure / interviews AS structure,
+        sum_confidence / interviews AS confidence,
+        sum_relevance / interviews AS relevance,
+        sum_communication / interviews AS communication,
+        sum_overall / interviews AS overall_rating
+    FROM cohort_score_totals
+    WHERE college_id = $1
+    ORDER BY overall_rating DESC
+"""
+
+DISTRIBUTION_QUERY = """
+    SELECT bucket, SUM(interviews)::bigint AS interviews
+    FROM score_histogram
+    GROUP BY bucket
+    ORDER BY bucket
+"""
+
+COLLEGE_DISTRIBUTION_QUERY = """
+    SELECT bucket, SUM(interviews)::bigint AS interviews
+    FROM score_histogram
+    WHERE college_id = $1
+    GROUP BY bucket
+    ORDER BY bucket
+"""
+
+MOST_IMPROVED_QUERY = """
+    SELECT stud_id, full_name, college_id, department_id, interviews,
+           first_overall, latest_overall, best_overall, improvement, latest_at
+    FROM student_progress
+    WHERE interviews > 1
+    ORDER BY improvement DESC
+    LIMIT $1
+"""
+
+COLLEGE_MOST_IMPROVED_QUERY = """
+    SELECT stud_id, full_name, college_id, department_id, interviews,
+           first_overall, latest_overall, best_overall, improvement, latest_at
+    FROM student_progress
+    WHERE interviews > 1 AND college_id = $2
+    ORDER BY improvement DESC
+    LIMIT $1
+"""
+
+STUDENT_RESULTS_QUERY = """
+    SELECT question, clarity, structure, confidence, relevance, communication, overall_rating, feedback, created_at
+    FROM interview_results
+    WHERE stud_id = $1
+    ORDER BY created_at DESC
+    LIMIT $2
+"""
+
+
+# SQLSTATE of "relation does not exist"
+UNDEFINED_TABLE = "42P01"
+
+
+class ResultStore:
+    """Writes analyses to Postgres and keeps the analytics aggregates current.
+
+    `create_schema` runs once at startup; if the database wasn't reachable then,
+    the tables are created the first time a query finds them missing. Storing is
+    best effort: a failure is logged and never fails the interview.
+    """
+
+    def __init__(self, db_pool):
+        self.db_pool = db_pool
+
+    def create_schema(self):
+        """Creates the results and aggregate tables if they don't exist yet."""
+        try:
+            self.db_pool.execute(SCHEMA)
+        except Exception as e:
+            logger.warning(f"Could not create the analytics tables, results won't be stored until they exist: {e}")
+
+    def fetch(self, name: str, sql: str, params: tuple = ()) -> list:
+        """Runs a prepared query against the analytics tables, creating them if they are missing."""
+        try:
+            return self.db_pool.fetch_prepared(name, sql, params)
+        except Exception as e:
+            if getattr(e, "pgcode", None) != UNDEFINED_TABLE:
+                raise
+        self.create_schema()
+        return self.db_pool.fetch_prepared(name, sql, params)
+
+    def record(self, analysis_key: str, stud_id: str, question: str, analysis: dict) -> bool:
+        """Stores one analysis; returns False if it was already stored or couldn't be."""
+        ratings = analysis["ratings"]
+        try:
+            rows = self.fetch("record_result", RECORD_RESULT_QUERY, (
+                stud_id, analysis_key, question,
+                ratings["clarity"], ratings["structure"], ratings["confidence"],
+                ratings["relevance"], ratings["communication"], ratings["overall_rating"],
+                json.dumps(analysis["feedback"]),
+            ))
+        except Exception as e:
+            logger.warning(f"Could not store the analysis for student {stud_id}: {e}")
+            return False
+        return bool(rows)
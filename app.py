@@ -1,5 +1,5 @@
 import os
-import time
+import uuid
 import gradio as gr
 from pathlib import Path
 from typing import Optional
@@ -9,6 +9,7 @@ from agno.media import Audio
 from agno.models.google import Gemini
 from agno.utils.log import logger
 from dotenv import load_dotenv
+from audio import compress_for_model
 
 # Load environment variables
 load_dotenv()
@@ -42,39 +43,36 @@ class InterviewAnalysis(BaseModel):
     feedback: Feedback
     candidate_response: str
 
-# Initialize Agent
+# Initialize the model; agents are built per call since an Agent keeps per-run state
 model = Gemini(id="gemini-2.0-flash-001")
-agent = Agent(
-    model=model,
-    markdown=True,
-    response_model=InterviewAnalysis,
-    structured_outputs=True,
-)
-# Temporary variable to store the last recorded audio file path
-temp_audio_file = None
+
+def create_agent():
+    return Agent(
+        model=model,
+        markdown=True,
+        response_model=InterviewAnalysis,
+        structured_outputs=True,
+    )
 
 import shutil
 
 def save_audio(audio_path):
-    """Saves the recorded/uploaded audio in the temp folder."""
-    global temp_audio_file
+    """Saves the recorded/uploaded audio in the temp folder and remembers it for this browser session only."""
     if not audio_path:
-        return "⚠️ No audio recorded or uploaded."
+        return "⚠️ No audio recorded or uploaded.", None
 
-    # Generate a unique filename using timestamp
-    filename = f"audio_{int(time.time())}.wav"
+    # Unique per recording, so concurrent users never overwrite each other's audio
+    filename = f"audio_{uuid.uuid4().hex}.wav"
     temp_audio_file = os.path.join(TEMP_DIR, filename)
     
     # Move the file using shutil to avoid cross-device issues
     shutil.move(audio_path, temp_audio_file)
     
-    return f"✅ Audio saved: {temp_audio_file}"
+    return f"✅ Audio saved: {temp_audio_file}", temp_audio_file
 
 
-def analyze_interview():
-    """Processes the last recorded audio file."""
-    global temp_audio_file
-
+def analyze_interview(temp_audio_file):
+    """Processes the audio file saved in this session."""
     if not temp_audio_file or not Path(temp_audio_file).exists():
         return "⚠️ No valid audio file found.", "", ""
 
@@ -85,18 +83,16 @@ def analyze_interview():
         with open(temp_audio_file, "rb") as f:
             audio_bytes = f.read()
 
-        # Pass raw bytes to Agno's Audio class
-        audio = Audio(content=audio_bytes, mime_type="audio/wav")  # Adjust mime_type if needed
+        # Downsample to 16 kHz mono Opus and pass the bytes to Agno's Audio class
+        audio_bytes, mime_type, _ = compress_for_model(audio_bytes, "audio/wav")
+        audio = Audio(content=audio_bytes, mime_type=mime_type)
 
     except Exception as e:
         logger.error(f"Error loading audio file: {e}")
         return "⚠️ Error loading the audio file.", "❌ No suggestions available.", "❌ Could not generate a response."
-    trans = """
-    Hi. Hi, sir. Good afternoon. Uh, Nikita, tell me about yourself first. First of all, thanks to Teki for Software Solutions for giving this opportunity to introduce myself. My name is D Nikita. I was born and brought up in Hyderabad, coming to my education qualification. Right now, I am pursuing BCom final year in uh in Siddharthare College. I have completed my intermediate from Shiari Junior College. I have done my SSE from Holy Cross High School in my family. We are 5 members, including me, my father, mother, my elder brother, me and my grandmother. My father is a salesman. My mother is a homemaker. My my elder brother is um uh sorry. My elder brother is, um, right now he's searching for a job. My goals, uh, my goal is to get a job in MNC company and become a a financially independent person. My hobbies are My hobbies are Listening music Uh, we. That's it. What is, uh, what are your strengths and weakness? My strength is my family and my friends. My weakness is my father. What father, your father is your weakness also, uh, he has health issues, that's why, uh. OK. Oh, OK. You said your hobbies is to listening music. Yeah, uh, what type of genre, uh, you prefer to listen to music, melody songs, melody songs, yeah. Can you sing a song? See right now OK. Uh, just tell me about your, uh, your role model. Do you have any role model? I just follow actor, TV actor. Uh, he's good looking as a, uh, he's a, he came from a low, lower family and he become Uh, that's it. OK. Uh, I will ask you one question. Uh, a man stands on one side of the river and his dog is on, uh, other side of the river, and he called his dog and uh immediately crosses the river, uh, without, uh, getting wet. How is it possible? There is no bridge or there is no boat. How did the dog, uh, go to him? Without getting wet. He came, uh, he, he, he didn't go. He just stayed at that side. from riverside, he can go. He, he, he didn't go anywhere, he just stand on his side, and he called his dog. The dog just Went to uh went to the other side without getting wet, there's no board, there's no bridge. Is there any other way to go, sir? There's no any other way. From coastal side there's no other way OK. OK, think about it. Uh, I will ask you another question. Uh, if you want to be an animal, which one will you choose? Peacock. I'm, I'm asking animal, animal, uh. Dear, I like white deer. Because they look very cute and. Oh it's so cute. OK. OK, did you get the answer? No, sir. I didn't get it. OK. Uh, how's the workshop? It is very nice. OK. Uh, can you differentiate yourself before workshop and after workshop before workshop, I don't know about any anything about IT. After you coming, I know about basics of IT because I, I did not even know about the technical job and non-technical job. From I came here only. I get to know that. Is it uh Uh, can you scale it, uh, from 10 points? How, uh, how many points will you give? For the workshop. 9.5. OK. OK, thank you. Thank you.
-    """
     prompt = f"""
     You are an AI mock interview coach designed to help freshers practice the question: "Tell me about yourself." 
-    Your task is to evaluate the candidate's response based on the provided transcript {trans} and generate feedback.
+    Your task is to transcribe the attached audio recording of the candidate's response, evaluate it and generate feedback.
 
     ### **Evaluation Criteria:**
     1️⃣ **Clarity (1-10):** Is the response clear and structured?  
@@ -128,7 +124,7 @@ def analyze_interview():
 
     try:
         # response = agent.print_response(prompt, stream=True)
-        response = agent.run(prompt)  # Correct way to fetch AI response
+        response = create_agent().run(prompt, audio=[audio])  # Correct way to fetch AI response
         logger.info(f"AI Response: {response}")  # Debugging
       
         if response:
@@ -149,6 +145,8 @@ with gr.Blocks() as demo:
 
     stop_btn = gr.Button("🛑 Stop & Save Audio")
     submit_btn = gr.Button("📤 Submit & Analyze")
+    # Path of this session's saved recording
+    saved_audio = gr.State(None)
 
     status_output = gr.Textbox(label="ℹ️ Status")
     transcript_output = gr.Textbox(label="📝 Generated Transcript")
@@ -158,11 +156,12 @@ with gr.Blocks() as demo:
     stop_btn.click(
         save_audio,
         inputs=[audio_input],
-        outputs=[status_output]
+        outputs=[status_output, saved_audio]
     )
 
     submit_btn.click(
         analyze_interview,
+        inputs=[saved_audio],
         outputs=[transcript_output, suggestions_output, candidate_response_output]
     )
 
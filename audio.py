@@ -0,0 +1,113 @@
+import io
+import wave
+from typing import BinaryIO, NamedTuple, Optional, Tuple, Union
+
+from fastapi import HTTPException
+from agno.utils.log import logger
+
+# name -> (pydub/ffmpeg format, codec, mime type, file extension)
+FORMATS = {
+    "flac": ("flac", None, "audio/flac", ".flac"),
+    "opus": ("ogg", "libopus", "audio/ogg", ".ogg"),
+    "wav": ("wav", None, "audio/wav", ".wav"),
+}
+EXTENSIONS = {"audio/wav": ".wav", "audio/x-wav": ".wav", "audio/wave": ".wav", "audio/flac": ".flac",
+              "audio/ogg": ".ogg", "audio/mpeg": ".mp3", "audio/webm": ".webm"}
+
+
+class ProcessedAudio(NamedTuple):
+    data: bytes
+    mime_type: str
+    extension: str
+    duration: Optional[float]
+
+
+def wav_duration(data: Union[bytes, BinaryIO]) -> Optional[float]:
+    """Duration in seconds of a WAV payload, or None if it isn't a readable WAV.
+
+    A file object is rewound afterwards, and only its header is read.
+    """
+    file = io.BytesIO(data) if isinstance(data, (bytes, bytearray)) else data
+    try:
+        size = file.seek(0, io.SEEK_END)
+        file.seek(0)
+        with wave.open(file, "rb") as w:
+            # Streamed browser recordings may leave the length in the header unset (0xFFFFFFFF)
+            frames = min(w.getnframes(), size // (w.getsampwidth() * w.getnchannels()))
+            return frames / float(w.getframerate())
+    except (wave.Error, EOFError, ZeroDivisionError):
+        return None
+    finally:
+        file.seek(0)
+
+
+def trim_silence(segment, silence_thresh: float = -45.0, keep_ms: int = 200):
+    """Cuts leading and trailing silence, keeping `keep_ms` of padding on each side."""
+    from pydub.silence import detect_leading_silence
+
+    start = detect_leading_silence(segment, silence_threshold=silence_thresh)
+    end = len(segment) - detect_leading_silence(segment.reverse(), silence_threshold=silence_thresh)
+    if start >= end:
+        return segment[:0]
+    return segment[max(start - keep_ms, 0):min(end + keep_ms, len(segment))]
+
+
+def check_duration(duration: Optional[float], max_seconds: Optional[float]):
+    if max_seconds and duration is not None and duration > max_seconds:
+        raise HTTPException(
+            status_code=413, detail=f"Recording is {duration:.0f}s long; the limit is {max_seconds:.0f}s."
+        )
+
+
+def preprocess_audio(data: bytes, mime_type: str = "audio/wav", fmt: str = "flac", sample_rate: int = 16000,
+                     max_seconds: Optional[float] = None, silence_thresh: float = -45.0,
+                     bitrate: Optional[str] = None) -> ProcessedAudio:
+    """Normalizes a browser recording before upload or analysis.
+
+    Converts to mono at `sample_rate`, trims leading/trailing silence, rejects
+    silent recordings (422) and ones longer than `max_seconds` (413) and encodes
+    to `fmt` (see FORMATS).
+    Without ffmpeg, WAV input is still resampled and trimmed but stays WAV, and
+    other input is passed through unchanged.
+    """
+    try:
+        from pydub import AudioSegment
+
+        # WAV is parsed natively; everything else needs ffmpeg
+        segment = AudioSegment(data) if data[:4] == b"RIFF" else AudioSegment.from_file(io.BytesIO(data))
+    except Exception as e:
+        logger.warning(f"Audio preprocessing unavailable, using original audio: {e}")
+        duration = wav_duration(data)
+        check_duration(duration, max_seconds)
+        return ProcessedAudio(data, mime_type, EXTENSIONS.get(mime_type, ".wav"), duration)
+
+    segment = trim_silence(segment.set_channels(1).set_frame_rate(sample_rate), silence_thresh)
+    if not len(segment):
+        raise HTTPException(status_code=422, detail="No speech detected in the recording.")
+    duration = len(segment) / 1000.0
+    check_duration(duration, max_seconds)
+
+    container, codec, out_mime_type, extension = FORMATS[fmt]
+    output = io.BytesIO()
+    try:
+        segment.export(output, format=container, codec=codec, bitrate=bitrate)
+    except Exception as e:
+        # Encoders other than WAV need ffmpeg; the resampled, trimmed WAV is still much smaller
+        logger.warning(f"Could not encode audio as {fmt}, using WAV: {e}")
+        container, codec, out_mime_type, extension = FORMATS["wav"]
+        output = io.BytesIO()
+        segment.export(output, format=container)
+    return ProcessedAudio(output.getvalue(), out_mime_type, extension, duration)
+
+
+def compress_for_model(data: bytes, mime_type: str = "audio/wav", sample_rate: int = 16000,
+                       bitrate: str = "24k", max_seconds: Optional[float] = None) -> Tuple[bytes, str, Optional[float]]:
+    """Downsamples a recording to mono Opus for inline model input.
+
+    Returns (bytes, mime_type, duration_seconds). Speech at 16 kHz mono / 24 kbps is
+    plenty for transcription and is a small fraction of a browser WAV. Recordings
+    longer than `max_seconds` are rejected (413).
+    """
+    processed = preprocess_audio(data, mime_type, fmt="opus", sample_rate=sample_rate, bitrate=bitrate,
+                                 max_seconds=max_seconds)
+    return processed.data, processed.mime_type, processed.duration
@@ -0,0 +1,43 @@
+import argparse
+import csv
+import json
+import time
+
+import requests
+
+BATCH_URL = "http://127.0.0.1:8000/analyze-batch/"
+JOB_URL = "http://127.0.0.1:8000/jobs/{job_id}"
+
+def load_items(path):
+    """Reads (job_name, stud_id, question) entries from a JSON list or a CSV file with those columns."""
+    with open(path, newline="") as f:
+        if path.endswith(".csv"):
+            return [{"job_name": row["job_name"], "stud_id": row["stud_id"], "question": row["question"]} for row in csv.DictReader(f)]
+        return json.load(f)
+
+def run_batch(items, poll_interval=5):
+    """Submits a batch to the API and waits for the per-item results."""
+    response = requests.post(BATCH_URL, json=items)
+    response.raise_for_status()
+    job_id = response.json()["job_id"]
+    print(f"Batch job {job_id}: {len(items)} interviews queued")
+
+    while True:
+        job = requests.get(JOB_URL.format(job_id=job_id)).json()
+        if job["status"] == "completed":
+            return job["result"]["items"]
+        if job["status"] == "failed":
+            raise RuntimeError(f"Batch job failed: {job['error']}")
+        time.sleep(poll_interval)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Analyze a cohort of recorded interviews in one batch.")
+    parser.add_argument("items", help="JSON or CSV file with job_name, stud_id and question per interview")
+    parser.add_argument("-o", "--output", default="batch_results.json", help="where to write the results")
+    args = parser.parse_args()
+
+    results = run_batch(load_items(args.items))
+    with open(args.output, "w") as f:
+        json.dump(results, f, indent=2)
+    failed = sum(1 for result in results if result.get("status") != "completed")
+    print(f"{len(results) - failed} analyzed, {failed} failed. Results written to {args.output}")
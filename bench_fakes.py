@@ -0,0 +1,223 @@
+# The API from new.py wired to local stand-ins for S3, Transcribe, Gemini, Postgres and gTTS.
+# Serve it with `uvicorn bench_fakes:app` (bench_load.py does this for you). The fakes'
+# latencies come from BENCH_* environment variables; everything else is configured
+# exactly like new.py, so the job, cache and limiter settings under test are the real ones.
+import asyncio
+import hashlib
+import os
+import random
+import sqlite3
+import threading
+import time
+import uuid
+from types import SimpleNamespace
+
+os.environ.setdefault("GOOGLE_API_KEY", "bench")
+os.environ.setdefault("AWS_ACCESS_KEY_ID", "bench")
+os.environ.setdefault("AWS_SECRET_ACCESS_KEY", "bench")
+os.environ.setdefault("AWS_DEFAULT_REGION", "us-east-1")
+os.environ.setdefault("S3_BUCKET_NAME", "bench")
+os.environ.setdefault("WARM_SERVICES", "0")
+
+import new
+from tts import SpeechRenderer, speech_key
+
+S3_LATENCY = float(os.getenv("BENCH_S3_LATENCY", "0.05"))
+TRANSCRIBE_LATENCY = float(os.getenv("BENCH_TRANSCRIBE_LATENCY", "5"))
+MODEL_LATENCY = float(os.getenv("BENCH_MODEL_LATENCY", "3"))
+DB_LATENCY = float(os.getenv("BENCH_DB_LATENCY", "0.005"))
+TTS_LATENCY = float(os.getenv("BENCH_TTS_LATENCY", "1"))
+STUDENTS = int(os.getenv("BENCH_STUDENTS", "1000"))
+BENCH_URL = os.getenv("BENCH_URL", "http://127.0.0.1:8000")
+
+WORDS = ("I", "have", "worked", "on", "projects", "team", "python", "data", "learned", "customers",
+         "building", "college", "internship", "problem", "solved", "lead", "design", "results", "and", "the")
+
+
+def synthetic_transcript(job_name: str, words: int = 150) -> str:
+    """A deterministic pseudo-answer; the same job always gets the same transcript."""
+    rng = random.Random(job_name)
+    return " ".join(rng.choice(WORDS) for _ in range(words)) + "."
+
+
+class FakeS3:
+    """In-memory object store with the subset of the boto3 S3 client the API uses."""
+
+    class exceptions:
+        ClientError = KeyError
+
+    def __init__(self, latency: float):
+        self.latency = latency
+        self.objects = {}
+        self._uploads = {}
+        self._lock = threading.Lock()
+
+    def put_object(self, Bucket, Key, Body, **kwargs):
+        time.sleep(self.latency)
+        with self._lock:
+            self.objects[Key] = bytes(Body)
+        return {"ETag": hashlib.md5(Body).hexdigest()}
+
+    def create_multipart_upload(self, Bucket, Key, **kwargs):
+        upload_id = uuid.uuid4().hex
+        with self._lock:
+            self._uploads[upload_id] = {}
+        return {"UploadId": upload_id}
+
+    def upload_part(self, Bucket, Key, UploadId, PartNumber, Body, **kwargs):
+        time.sleep(self.latency)
+        with self._lock:
+            self._uploads[UploadId][PartNumber] = bytes(Body)
+        return {"ETag": hashlib.md5(Body).hexdigest()}
+
+    def complete_multipart_upload(self, Bucket, Key, UploadId, MultipartUpload, **kwargs):
+        with self._lock:
+            parts = self._uploads.pop(UploadId)
+            self.objects[Key] = b"".join(parts[part["PartNumber"]] for part in MultipartUpload["Parts"])
+        return {"Key": Key}
+
+    def abort_multipart_upload(self, Bucket, Key, UploadId, **kwargs):
+        with self._lock:
+            self._uploads.pop(UploadId, None)
+
+    def head_object(self, Bucket, Key, **kwargs):
+        with self._lock:
+            return {"ContentLength": len(self.objects[Key])}
+
+    def upload_file(self, Filename, Bucket, Key, **kwargs):
+        with open(Filename, "rb") as f:
+            self.put_object(Bucket=Bucket, Key=Key, Body=f.read())
+
+    def generate_presigned_url(self, operation, Params, ExpiresIn=3600):
+        return f"https://{Params['Bucket']}.s3.invalid/{Params['Key']}"
+
+
+class FakeTranscribe:
+    """Transcribe jobs that complete `latency` seconds after they are first seen."""
+
+    def __init__(self, latency: float):
+        self.latency = latency
+        self._started = {}
+        self._lock = threading.Lock()
+
+    def get_transcription_job(self, TranscriptionJobName):
+        with self._lock:
+            started = self._started.setdefault(TranscriptionJobName, time.monotonic())
+        job = {"TranscriptionJobName": TranscriptionJobName, "TranscriptionJobStatus": "IN_PROGRESS"}
+        if time.monotonic() - started >= self.latency:
+            job["TranscriptionJobStatus"] = "COMPLETED"
+            job["Transcript"] = {"TranscriptFileUri": f"{BENCH_URL}/_bench/transcripts/{TranscriptionJobName}"}
+        return {"TranscriptionJob": job}
+
+
+class SqliteStudents:
+    """Synthetic students in SQLite, answering the two prepared queries the API runs."""
+
+    def __init__(self, count: int, latency: float):
+        self.latency = latency
+        self._conn = sqlite3.connect(":memory:", check_same_thread=False)
+        self._conn.row_factory = sqlite3.Row
+        self._lock = threading.Lock()
+        self._conn.execute(
+            "CREATE TABLE students (stud_id TEXT PRIMARY KEY, full_name TEXT, college_name TEXT, department_name TEXT)"
+        )
+        self._conn.executemany(
+            "INSERT INTO students VALUES (?, ?, ?, ?)",
+            ((str(i), f"Student {i}", f"College {i % 50}", f"Department {i % 8}") for i in range(1, count + 1)),
+        )
+
+    def _query(self, student_ids):
+        time.sleep(self.latency)
+        marks = ",".join("?" * len(student_ids))
+        with self._lock:
+            rows = self._conn.execute(f"SELECT * FROM students WHERE stud_id IN ({marks})", student_ids).fetchall()
+        return [dict(row) for row in rows]
+
+    def fetch_prepared(self, name, sql, params):
+        if name not in ("student_details", "students_details"):
+            # Result storage and analytics are not part of the benchmark
+            return []
+        value = params[0]
+        if value.startswith("{"):
+            return self._query([sid.strip('"') for sid in value[1:-1].split(",") if sid])
+        return self._query([value])
+
+    def execute(self, sql, params=()):
+        pass
+
+    def fetch_one(self, sql, params=()):
+        return {"now": time.time()}
+
+    def close(self):
+        pass
+
+
+class StubAgent:
+    """Answers like the Gemini agent after `latency` seconds, with plausible token counts."""
+
+    def __init__(self, response_model, latency: float):
+        self.response_model = response_model
+        self.latency = latency
+
+    async def arun(self, prompt, audio=None, **kwargs):
+        await asyncio.sleep(self.latency)
+        if self.response_model is new.BatchAnalysis:
+            # Packed batch prompts need per-item IDs the stub doesn't parse; the API falls back to single calls
+            raise ValueError("Stub model only answers single interviews")
+        rng = random.Random(hashlib.sha256(prompt.encode("utf-8")).digest())
+        output = {
+            "transcript": "synthetic transcript",
+            "ratings": {k: rng.randint(4, 9) for k in ("clarity", "structure", "confidence", "relevance", "communication")},
+            "feedback": {
+                "strengths": "Clear examples from past projects.",
+                "improvements": "Structure the answer around one or two highlights.",
+                "suggestions": "Close with why the role fits your goals.",
+            },
+            "candidate_response": "I am a final year student who enjoys building data tools. "
+                                  "During my internship I automated reporting for our team. "
+                                  "I would like to bring that experience to this role.",
+        }
+        # Fields the requested schema doesn't have (e.g. transcript) are dropped, like a real structured output
+        content = self.response_model.model_validate(output)
+        return SimpleNamespace(
+            content=content,
+            metrics={"input_tokens": [len(prompt) // 4], "output_tokens": [len(content.model_dump_json()) // 4]},
+        )
+
+
+class FakeSpeechRenderer(SpeechRenderer):
+    """Writes a placeholder MP3 after `latency` seconds instead of calling gTTS."""
+
+    def __init__(self, cache_dir: str, latency: float):
+        super().__init__(cache_dir)
+        self.latency = latency
+
+    def render(self, text, lang="en", voice="com", fallback=True):
+        key = speech_key(text, lang, voice)
+        path = self.lookup(key)
+        if path is None:
+            time.sleep(self.latency)
+            path = os.path.join(self.cache_dir, key + ".mp3")
+            with open(path, "wb") as f:
+                f.write(b"\xff\xfb\x90\x00" + b"\x00" * 413)
+        return key, path
+
+
+s3 = FakeS3(S3_LATENCY)
+transcribe = FakeTranscribe(TRANSCRIBE_LATENCY)
+new.s3_client = s3
+new.transcribe_client = transcribe
+new.transcription_waiter.transcribe_client = transcribe
+new.db_pool = SqliteStudents(STUDENTS, DB_LATENCY)
+# Bound to the pool when new.py was imported; results must never reach a real database
+new.result_store = new.ResultStore(new.db_pool)
+new.create_agent = lambda response_model=new.ModelAnalysis: StubAgent(response_model, MODEL_LATENCY)
+new.speech_renderer = FakeSpeechRenderer(new.TTS_CACHE_DIR, TTS_LATENCY)
+
+app = new.app
+
+
+@app.get("/_bench/transcripts/{job_name}")
+def bench_transcript(job_name: str):
+    """Transcribe output JSON for a fake job."""
+    return {"jobName": job_name, "results": {"transcripts": [{"transcript": synthetic_transcript(job_name)}]}}
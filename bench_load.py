@@ -0,0 +1,223 @@
+import argparse
+import io
+import json
+import math
+import os
+import re
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import uuid
+import wave
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import requests
+
+from bench_startup import HERE, free_port
+
+QUESTION = "Tell me about yourself"
+
+def synthetic_wav(seed, seconds=20.0, sample_rate=16000):
+    """A unique, speech-sized WAV (tones with pauses) so every request misses the upload and analysis caches."""
+    t = np.arange(int(seconds * sample_rate)) / sample_rate
+    # Half a second of tone, a quarter second of silence, like words and pauses
+    voiced = (t % 0.75) < 0.5
+    samples = (8000 * np.sin(2 * np.pi * (180 + seed % 120) * t) * voiced).astype("<i2")
+    output = io.BytesIO()
+    with wave.open(output, "wb") as w:
+        w.setnchannels(1)
+        w.setsampwidth(2)
+        w.setframerate(sample_rate)
+        w.writeframes(samples.tobytes())
+    return output.getvalue()
+
+def percentile(values, q):
+    """Nearest-rank percentile of `values` (q in 0-100)."""
+    if not values:
+        return None
+    ordered = sorted(values)
+    return round(ordered[min(len(ordered) - 1, max(0, math.ceil(q / 100 * len(ordered)) - 1))], 3)
+
+def summarize(latencies, errors, wall_seconds):
+    return {
+        "requests": len(latencies) + len(errors),
+        "errors": len(errors),
+        "first_errors": errors[:3],
+        "throughput_rps": round(len(latencies) / wall_seconds, 3) if wall_seconds else None,
+        "mean_seconds": round(statistics.mean(latencies), 3) if latencies else None,
+        "p50_seconds": percentile(latencies, 50),
+        "p95_seconds": percentile(latencies, 95),
+        "p99_seconds": percentile(latencies, 99),
+    }
+
+def wait_for_job(base_url, job_id, timeout):
+    """Follows the job's server-sent events until it finishes and returns the final job."""
+    with requests.get(f"{base_url}/jobs/{job_id}/events", stream=True, timeout=timeout) as events:
+        job = None
+        for line in events.iter_lines():
+            if line.startswith(b"data: "):
+                job = json.loads(line[len(b"data: "):])
+                if job["status"] in ("completed", "failed"):
+                    return job
+    raise RuntimeError(f"Event stream for job {job_id} ended early")
+
+def upload_interview(base_url, index, args, audio=None):
+    """One /upload-audio/ request followed until its pipeline finishes. Returns end-to-end seconds."""
+    audio = audio or synthetic_wav(index, args.audio_seconds)
+    stud_id = str(index % args.students + 1)
+    start = time.perf_counter()
+    response = requests.post(
+        f"{base_url}/upload-audio/",
+        files={"audio": (f"bench_{index}.wav", audio, "audio/wav")},
+        params={"stud_id": stud_id, "question": QUESTION, "mode": args.mode},
+        headers={"X-Trace-Id": uuid.uuid4().hex},
+        timeout=args.timeout,
+    )
+    response.raise_for_status()
+    job = wait_for_job(base_url, response.json()["job_id"], args.timeout)
+    if job["status"] != "completed":
+        raise RuntimeError(job["error"])
+    return time.perf_counter() - start
+
+def analyze_interview(base_url, index, args, run_id):
+    """One synchronous /analyze-interview/ request for a transcript nobody has asked for yet."""
+    start = time.perf_counter()
+    response = requests.post(
+        f"{base_url}/analyze-interview/",
+        params={"job_name": f"bench_{run_id}_{index}.txt", "stud_id": str(index % args.students + 1), "question": QUESTION},
+        headers={"X-Trace-Id": uuid.uuid4().hex},
+        timeout=args.timeout,
+    )
+    response.raise_for_status()
+    return time.perf_counter() - start
+
+def run_load(call, total, concurrency):
+    """Runs `call(index)` `total` times with `concurrency` in flight and summarizes the latencies."""
+    latencies, errors = [], []
+    lock = threading.Lock()
+
+    def one(index):
+        try:
+            elapsed = call(index)
+            with lock:
+                latencies.append(elapsed)
+        except Exception as e:
+            with lock:
+                errors.append(str(e))
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        list(pool.map(one, range(total)))
+    return summarize(latencies, errors, time.perf_counter() - start)
+
+def stage_means(base_url):
+    """Mean seconds and count per pipeline stage, read from the server's /metrics histograms."""
+    try:
+        text = requests.get(f"{base_url}/metrics", timeout=10).text
+    except requests.RequestException:
+        return {}
+    sums, counts = {}, {}
+    for name, labels, value in re.findall(r'^interview_stage_seconds_(sum|count)\{([^}]*)\} (\S+)$', text, re.M):
+        stage = re.search(r'stage="([^"]*)"', labels).group(1)
+        target = sums if name == "sum" else counts
+        target[stage] = target.get(stage, 0) + float(value)
+    return {stage: {"mean_seconds": round(sums[stage] / counts[stage], 4), "count": int(counts[stage])}
+            for stage in sorted(sums) if counts.get(stage)}
+
+def memory_kb(pid):
+    """Current and peak resident memory of a local process (Linux only)."""
+    try:
+        with open(f"/proc/{pid}/status") as f:
+            status = dict(line.split(":", 1) for line in f if ":" in line)
+        return {"rss_kb": int(status["VmRSS"].split()[0]), "peak_rss_kb": int(status["VmHWM"].split()[0])}
+    except (OSError, KeyError, ValueError):
+        return None
+
+def start_server(args, workdir):
+    """Launches bench_fakes:app under uvicorn and waits until it answers."""
+    port = free_port()
+    base_url = f"http://127.0.0.1:{port}"
+    env = dict(
+        os.environ,
+        BENCH_URL=base_url,
+        BENCH_S3_LATENCY=str(args.s3_latency),
+        BENCH_TRANSCRIBE_LATENCY=str(args.transcribe_latency),
+        BENCH_MODEL_LATENCY=str(args.model_latency),
+        BENCH_DB_LATENCY=str(args.db_latency),
+        BENCH_TTS_LATENCY=str(args.tts_latency),
+        BENCH_STUDENTS=str(args.students),
+        PUBLIC_BASE_URL=base_url,
+        # Fresh caches per run, so results don't depend on earlier runs
+        UPLOAD_INDEX_PATH=os.path.join(workdir, "uploads.db"),
+        ANALYSIS_CACHE_PATH=os.path.join(workdir, "analysis_cache.db"),
+        JOB_STORE=os.path.join(workdir, "jobs.db"),
+        TTS_CACHE_DIR=os.path.join(workdir, "tts_cache"),
+    )
+    server = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "bench_fakes:app", "--port", str(port), "--log-level", "warning"],
+        cwd=HERE, env=env, stdout=subprocess.DEVNULL, stderr=None if args.verbose else subprocess.DEVNULL,
+    )
+    deadline = time.perf_counter() + 60
+    while time.perf_counter() < deadline:
+        try:
+            if requests.get(f"{base_url}/openapi.json", timeout=1).status_code == 200:
+                return server, base_url
+        except requests.ConnectionError:
+            pass
+        if server.poll() is not None:
+            raise RuntimeError("Benchmark server exited during startup (rerun with --verbose)")
+        time.sleep(0.05)
+    server.terminate()
+    raise RuntimeError("Benchmark server did not answer in time")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Load-test the interview API against local fakes of S3, Transcribe, Gemini, Postgres and gTTS."
+    )
+    parser.add_argument("--scenario", choices=["upload", "analyze", "both"], default="both")
+    parser.add_argument("--requests", type=int, default=50, help="requests per scenario")
+    parser.add_argument("--concurrency", type=int, default=10)
+    parser.add_argument("--mode", default="transcribe", help="/upload-audio/ mode: transcribe, direct or auto")
+    parser.add_argument("--audio-seconds", type=float, default=20.0, help="length of each synthetic recording")
+    parser.add_argument("--same-audio", action="store_true", help="send one recording every time (cache hit path)")
+    parser.add_argument("--students", type=int, default=1000, help="synthetic students in the fake database")
+    parser.add_argument("--s3-latency", type=float, default=0.05, help="seconds per fake S3 PUT/part")
+    parser.add_argument("--transcribe-latency", type=float, default=5.0, help="seconds until a fake Transcribe job completes")
+    parser.add_argument("--model-latency", type=float, default=3.0, help="seconds per stub model call")
+    parser.add_argument("--db-latency", type=float, default=0.005, help="seconds per fake student query")
+    parser.add_argument("--tts-latency", type=float, default=1.0, help="seconds per fake TTS rendering")
+    parser.add_argument("--url", help="benchmark an already running server instead of starting the fakes")
+    parser.add_argument("--timeout", type=float, default=600)
+    parser.add_argument("--verbose", action="store_true", help="show the server's log output")
+    args = parser.parse_args()
+
+    server = None
+    with tempfile.TemporaryDirectory() as workdir:
+        if args.url:
+            base_url = args.url.rstrip("/")
+        else:
+            server, base_url = start_server(args, workdir)
+        try:
+            report = {"concurrency": args.concurrency, "requests": args.requests}
+            if args.scenario in ("upload", "both"):
+                shared_audio = synthetic_wav(0, args.audio_seconds) if args.same_audio else None
+                report["upload_audio"] = run_load(
+                    lambda i: upload_interview(base_url, i, args, shared_audio), args.requests, args.concurrency
+                )
+            if args.scenario in ("analyze", "both"):
+                run_id = uuid.uuid4().hex[:8]
+                report["analyze_interview"] = run_load(
+                    lambda i: analyze_interview(base_url, i, args, run_id), args.requests, args.concurrency
+                )
+            report["stages"] = stage_means(base_url)
+            if server is not None:
+                report["server_memory"] = memory_kb(server.pid)
+        finally:
+            if server is not None:
+                server.terminate()
+                server.wait()
+    print(json.dumps(report, indent=2))
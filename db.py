@@ -0,0 +1,175 @@
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+from typing import Any, List, Optional
+
+import psycopg2
+import psycopg2.extensions
+from psycopg2.extras import RealDictCursor
+from psycopg2.pool import ThreadedConnectionPool
+
+
+class PooledConnection(psycopg2.extensions.connection):
+    """psycopg2 connection that remembers when it was last used and what it has prepared."""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.autocommit = True
+        self.last_used = time.monotonic()
+        self.prepared = set()
+
+
+class DatabasePool:
+    """A fixed-size, health-checked psycopg2 connection pool.
+
+    The pool is opened on first use. Callers block until a connection is free
+    instead of failing when the pool is exhausted, and connections idle for longer
+    than `health_check_after` seconds are pinged before use and replaced if they
+    have gone away.
+    """
+
+    def __init__(self, size: int = 5, health_check_after: float = 30, **conn_kwargs):
+        self.size = size
+        self.health_check_after = health_check_after
+        self._conn_kwargs = conn_kwargs
+        self._pool = None
+        self._lock = threading.Lock()
+        self._slots = threading.BoundedSemaphore(size)
+
+    def _get_pool(self) -> ThreadedConnectionPool:
+        with self._lock:
+            if self._pool is None:
+                # minconn == maxconn, otherwise psycopg2 closes every connection above minconn on return
+                self._pool = ThreadedConnectionPool(
+                    self.size, self.size, connection_factory=PooledConnection, **self._conn_kwargs
+                )
+            return self._pool
+
+    def _checkout(self, pool: ThreadedConnectionPool) -> PooledConnection:
+        conn = pool.getconn()
+        if not conn.closed and time.monotonic() - conn.last_used < self.health_check_after:
+            return conn
+        try:
+            with conn.cursor() as cur:
+                cur.execute("SELECT 1")
+            return conn
+        except psycopg2.Error:
+            pool.putconn(conn, close=True)
+            return pool.getconn()
+
+    @contextmanager
+    def connection(self):
+        pool = self._get_pool()
+        self._slots.acquire()
+        conn = None
+        try:
+            conn = self._checkout(pool)
+            yield conn
+        except (psycopg2.OperationalError, psycopg2.InterfaceError):
+            if conn is not None:
+                pool.putconn(conn, close=True)
+                conn = None
+            raise
+        finally:
+            if conn is not None:
+                conn.last_used = time.monotonic()
+                pool.putconn(conn)
+            self._slots.release()
+
+    def fetch_one(self, sql: str, params: tuple = ()) -> Optional[dict]:
+        with self.connection() as conn, conn.cursor(cursor_factory=RealDictCursor) as cur:
+            cur.execute(sql, params)
+            row = cur.fetchone()
+        return dict(row) if row else None
+
+    def execute(self, sql: str, params: tuple = ()):
+        """Runs a statement (or several, separated by semicolons) that returns no rows."""
+        with self.connection() as conn, conn.cursor() as cur:
+            cur.execute(sql, params)
+
+    def fetch_prepared(self, name: str, sql: str, params: tuple = ()) -> list:
+        """Runs `sql` as a server-side prepared statement, preparing it once per connection.
+
+        `sql` uses $1, $2, ... placeholders as required by PREPARE.
+        """
+        with self.connection() as conn, conn.cursor(cursor_factory=RealDictCursor) as cur:
+            if name not in conn.prepared:
+                cur.execute(f"PREPARE {name} AS {sql}")
+                conn.prepared.add(name)
+            placeholders = ", ".join(["%s"] * len(params))
+            cur.execute(f"EXECUTE {name} ({placeholders})" if params else f"EXECUTE {name}", params)
+            rows = cur.fetchall()
+        return [dict(row) for row in rows]
+
+    def close(self):
+        with self._lock:
+            if self._pool is not None:
+                self._pool.closeall()
+                self._pool = None
+
+
+class TTLCache:
+    """A small thread-safe LRU cache whose entries expire after `ttl` seconds."""
+
+    def __init__(self, maxsize: int = 1024, ttl: float = 300):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key) -> Optional[Any]:
+        with self._lock:
+            item = self._data.get(key)
+            if item is None:
+                return None
+            expires_at, value = item
+            if expires_at < time.monotonic():
+                del self._data[key]
+                return None
+            self._data.move_to_end(key)
+            return value
+
+    def set(self, key, value):
+        with self._lock:
+            self._data[key] = (time.monotonic() + self.ttl, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def invalidate(self, key=None):
+        with self._lock:
+            if key is None:
+                self._data.clear()
+            else:
+                self._data.pop(key, None)
+
+
+class SqliteDatabase:
+    """A SQLite file shared by the threads of this process and every worker process on the host.
+
+    Statements are serialized on one connection; WAL keeps readers in other
+    processes from blocking on writers.
+    """
+
+    def __init__(self, path: str):
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, timeout=30)
+        self._conn.row_factory = sqlite3.Row
+        self._conn.execute("PRAGMA journal_mode=WAL")
+
+    def execute(self, sql: str, params: tuple = ()) -> int:
+        """Runs and commits a statement; returns the number of rows it changed."""
+        with self._lock:
+            cursor = self._conn.execute(sql, params)
+            self._conn.commit()
+        return cursor.rowcount
+
+    def fetch_one(self, sql: str, params: tuple = ()) -> Optional[sqlite3.Row]:
+        with self._lock:
+            return self._conn.execute(sql, params).fetchone()
+
+    def fetch_all(self, sql: str, params: tuple = ()) -> List[sqlite3.Row]:
+        with self._lock:
+            return self._conn.execute(sql, params).fetchall()
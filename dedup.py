@@ -0,0 +1,57 @@
+import hashlib
+import time
+from typing import BinaryIO, Optional
+
+from db import SqliteDatabase
+
+
+def hash_file(file: BinaryIO, chunk_size: int = 1024 * 1024) -> str:
+    """Returns the SHA-256 of a file object and rewinds it."""
+    digest = hashlib.sha256()
+    file.seek(0)
+    for chunk in iter(lambda: file.read(chunk_size), b""):
+        digest.update(chunk)
+    file.seek(0)
+    return digest.hexdigest()
+
+
+class UploadIndex:
+    """Persistent map from audio hash to its S3 key, Transcribe job and transcript."""
+
+    def __init__(self, path: str):
+        self._db = SqliteDatabase(path)
+        self._db.execute(
+            """
+            CREATE TABLE IF NOT EXISTS uploads (
+                sha256 TEXT PRIMARY KEY,
+                s3_key TEXT NOT NULL,
+                job_name TEXT NOT NULL UNIQUE,
+                job_id TEXT,
+                transcript TEXT,
+                created_at REAL NOT NULL
+            )
+            """
+        )
+
+    def get(self, sha256: str) -> Optional[dict]:
+        row = self._db.fetch_one("SELECT * FROM uploads WHERE sha256 = ?", (sha256,))
+        return dict(row) if row else None
+
+    def add(self, sha256: str, s3_key: str, job_name: str, job_id: Optional[str] = None):
+        self._db.execute(
+            "INSERT OR IGNORE INTO uploads (sha256, s3_key, job_name, job_id, created_at) VALUES (?, ?, ?, ?, ?)",
+            (sha256, s3_key, job_name, job_id, time.time()),
+        )
+
+    def remove(self, sha256: str):
+        self._db.execute("DELETE FROM uploads WHERE sha256 = ?", (sha256,))
+
+    def set_job_id(self, sha256: str, job_id: str):
+        self._db.execute("UPDATE uploads SET job_id = ? WHERE sha256 = ?", (job_id, sha256))
+
+    def get_transcript(self, job_name: str) -> Optional[str]:
+        row = self._db.fetch_one("SELECT transcript FROM uploads WHERE job_name = ?", (job_name,))
+        return row["transcript"] if row else None
+
+    def set_transcript(self, job_name: str, transcript: str):
+        self._db.execute("UPDATE uploads SET transcript = ? WHERE job_name = ?", (transcript, job_name))
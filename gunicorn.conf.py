@@ -0,0 +1,32 @@
+# Production run mode: `gunicorn -c gunicorn.conf.py new:app`
+#
+# Every worker is a separate process with its own event loop, job workers, model
+# limiter and lazily created clients. Jobs run in the worker that accepted the
+# upload; their state goes to JOB_STORE, so any worker (or replica, with a redis://
+# JOB_STORE) can answer /jobs/{id}. Transcribe notifications are passed on through
+# JOB_STORE as well, to whichever worker is waiting for that job.
+#
+# /metrics and /analysis-cache/stats are kept in process memory, so each scrape
+# reports only the worker that answered it. Scrape every worker (e.g. one port per
+# worker behind the load balancer) or treat the numbers as a sample. Per-worker limits such as JOB_WORKERS and
+# GEMINI_MAX_CONCURRENCY multiply by the number of workers.
+#
+# With more than one replica, also set TTS_S3_PREFIX so audio URLs don't depend on
+# which host rendered them, and point the SQLite caches at per-host paths.
+import multiprocessing
+import os
+
+bind = os.getenv("BIND", "0.0.0.0:8000")
+workers = int(os.getenv("WEB_CONCURRENCY", str(multiprocessing.cpu_count())))
+worker_class = "uvicorn.workers.UvicornWorker"
+
+# Requests are async and long pipelines run in background jobs, so this only
+# catches a wedged event loop
+timeout = int(os.getenv("WORKER_TIMEOUT", "120"))
+graceful_timeout = int(os.getenv("GRACEFUL_TIMEOUT", "30"))
+keepalive = 5
+
+# Don't preload: boto3, gRPC and process pools must be created after the fork
+preload_app = False
+
+accesslog = "-"
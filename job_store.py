@@ -0,0 +1,98 @@
+import json
+import time
+from typing import Dict, List, Optional
+
+from db import SqliteDatabase
+
+
+# Transcribe notifications are kept this long for the worker waiting on the job to pick up
+POKE_TTL = 3600
+
+
+class SqliteJobStore:
+    """Job snapshots in a SQLite file, shared by every worker process on the host.
+
+    Each worker runs the jobs it accepted and writes their state here, so any
+    worker can answer GET /jobs/{id} and stream its events. Transcribe
+    notifications ("pokes") go through here too, since they can land on any worker.
+    """
+
+    def __init__(self, path: str):
+        self._db = SqliteDatabase(path)
+        self._db.execute(
+            """
+            CREATE TABLE IF NOT EXISTS jobs (
+                id TEXT PRIMARY KEY,
+                state TEXT NOT NULL,
+                expires_at REAL NOT NULL
+            )
+            """
+        )
+        self._db.execute("CREATE TABLE IF NOT EXISTS pokes (job_name TEXT PRIMARY KEY, poked_at REAL NOT NULL)")
+
+    def save(self, job_id: str, state: dict, ttl: float):
+        self._db.execute(
+            "INSERT OR REPLACE INTO jobs (id, state, expires_at) VALUES (?, ?, ?)",
+            (job_id, json.dumps(state), time.time() + ttl),
+        )
+
+    def load(self, job_id: str) -> Optional[dict]:
+        row = self._db.fetch_one("SELECT state FROM jobs WHERE id = ? AND expires_at > ?", (job_id, time.time()))
+        return json.loads(row[0]) if row else None
+
+    def poke(self, job_names: List[str]):
+        for job_name in job_names:
+            self._db.execute("INSERT OR REPLACE INTO pokes (job_name, poked_at) VALUES (?, ?)", (job_name, time.time()))
+
+    def pokes(self, job_names: List[str]) -> Dict[str, float]:
+        """When each of `job_names` was last poked, for those that were."""
+        if not job_names:
+            return {}
+        marks = ",".join("?" * len(job_names))
+        rows = self._db.fetch_all(f"SELECT job_name, poked_at FROM pokes WHERE job_name IN ({marks})", tuple(job_names))
+        return {row[0]: row[1] for row in rows}
+
+    def expire(self):
+        self._db.execute("DELETE FROM jobs WHERE expires_at <= ?", (time.time(),))
+        self._db.execute("DELETE FROM pokes WHERE poked_at <= ?", (time.time() - POKE_TTL,))
+
+
+class RedisJobStore:
+    """Job snapshots in Redis (or anything speaking its protocol), shared across hosts and pods.
+
+    Requires the optional `redis` package.
+    """
+
+    def __init__(self, url: str, prefix: str = "interview:job:"):
+        import redis
+
+        self._redis = redis.Redis.from_url(url)
+        self.prefix = prefix
+
+    def save(self, job_id: str, state: dict, ttl: float):
+        self._redis.set(self.prefix + job_id, json.dumps(state), ex=max(int(ttl), 1))
+
+    def load(self, job_id: str) -> Optional[dict]:
+        value = self._redis.get(self.prefix + job_id)
+        return json.loads(value) if value else None
+
+    def poke(self, job_names: List[str]):
+        for job_name in job_names:
+            self._redis.set(self.prefix + "poke:" + job_name, time.time(), ex=POKE_TTL)
+
+    def pokes(self, job_names: List[str]) -> Dict[str, float]:
+        if not job_names:
+            return {}
+        values = self._redis.mget([self.prefix + "poke:" + job_name for job_name in job_names])
+        return {job_name: float(value) for job_name, value in zip(job_names, values) if value is not None}
+
+    def expire(self):
+        # Keys expire on their own
+        pass
+
+
+def open_job_store(location: str):
+    """A Redis store for redis:// / rediss:// URLs, otherwise a SQLite store at that path."""
+    if location.startswith(("redis://", "rediss://", "unix://")):
+        return RedisJobStore(location)
+    return SqliteJobStore(location)
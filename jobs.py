@@ -0,0 +1,210 @@
+import asyncio
+import copy
+import time
+import uuid
+from typing import AsyncIterator, Awaitable, Callable, Dict, List, Optional, Tuple
+
+from fastapi import HTTPException
+from agno.utils.log import logger
+
+from metrics import STAGE_SECONDS, new_trace_id, span, trace, trace_id_var
+
+Stage = Tuple[str, Callable[["Job"], Awaitable[None]]]
+
+
+class Job:
+    """A single interview pipeline run and its per-stage status."""
+
+    def __init__(self, stages: List[Stage], params: Optional[dict] = None):
+        self.id = uuid.uuid4().hex
+        self.status = "queued"
+        self.params = params or {}
+        self.stages = stages
+        self.stage_status = {name: {"status": "pending"} for name, _ in stages}
+        self.result: dict = {}
+        self.error: Optional[str] = None
+        self.created_at = time.time()
+        self.finished_at: Optional[float] = None
+        self.changed = asyncio.Event()
+        # Jobs carry on the trace of the request that submitted them
+        self.trace_id = trace_id_var.get() or new_trace_id()
+        self.spans: List[dict] = []
+
+    def _touch(self):
+        # Wake everyone watching this job, then arm a fresh event for the next change
+        self.changed.set()
+        self.changed = asyncio.Event()
+
+    def to_dict(self) -> dict:
+        """A snapshot of the job; later changes don't show up in it (watch() compares snapshots)."""
+        return copy.deepcopy({
+            "job_id": self.id,
+            "status": self.status,
+            "params": self.params,
+            "stages": self.stage_status,
+            "result": self.result,
+            "error": self.error,
+            "created_at": self.created_at,
+            "finished_at": self.finished_at,
+            "trace_id": self.trace_id,
+            "spans": self.spans,
+        })
+
+
+class JobManager:
+    """Runs pipeline jobs in the background on a fixed number of worker tasks.
+
+    Jobs beyond the worker count wait in a bounded queue, so request handlers only
+    enqueue and return. Finished jobs are kept for `retention` seconds.
+
+    A job runs in the process that accepted it. With a shared `store` (see
+    job_store.py) its state is also written there on every change, so other
+    worker processes or replicas can report on it, polling every `poll_interval`.
+    Store calls are blocking I/O and always run in a thread; expired snapshots
+    are purged every `expire_interval` seconds.
+    """
+
+    def __init__(self, workers: int = 4, max_queue: int = 1000, retention: float = 3600, store=None,
+                 poll_interval: float = 0.5, expire_interval: float = 60):
+        self.workers = workers
+        self.max_queue = max_queue
+        self.retention = retention
+        self.store = store
+        self.poll_interval = poll_interval
+        self.expire_interval = expire_interval
+        self.jobs: Dict[str, Job] = {}
+        self._queue: Optional[asyncio.Queue] = None
+        self._tasks: List[asyncio.Task] = []
+        self._janitor: Optional[asyncio.Task] = None
+        self.in_flight = 0
+
+    @property
+    def queue_depth(self) -> int:
+        return self._queue.qsize() if self._queue is not None else 0
+
+    def _ensure_workers(self):
+        if self._queue is None:
+            self._queue = asyncio.Queue(maxsize=self.max_queue)
+        self._tasks = [task for task in self._tasks if not task.done()]
+        loop = asyncio.get_running_loop()
+        while len(self._tasks) < self.workers:
+            self._tasks.append(loop.create_task(self._worker()))
+        if self.store is not None and (self._janitor is None or self._janitor.done()):
+            self._janitor = loop.create_task(self._expire_store())
+
+    async def submit(self, stages: List[Stage], params: Optional[dict] = None) -> Job:
+        """Queues a new job and returns it as soon as its state is visible to other workers."""
+        self._ensure_workers()
+        self._expire()
+        if self._queue.full():
+            raise HTTPException(status_code=503, detail="Too many interviews in progress, please retry shortly.")
+        job = Job(stages, params)
+        # Saved before it is queued, so the worker's later saves can't be overtaken by this one
+        await asyncio.to_thread(self._save, job)
+        try:
+            self._queue.put_nowait(job)
+        except asyncio.QueueFull:
+            raise HTTPException(status_code=503, detail="Too many interviews in progress, please retry shortly.")
+        self.jobs[job.id] = job
+        return job
+
+    async def find(self, job_id: str) -> Optional[dict]:
+        """Current state of a job run by this process or, via the store, by any other."""
+        job = self.jobs.get(job_id)
+        if job is not None:
+            return job.to_dict()
+        if self.store is not None and job_id:
+            return await asyncio.to_thread(self.store.load, job_id)
+        return None
+
+    async def get(self, job_id: str) -> dict:
+        state = await self.find(job_id)
+        if state is None:
+            raise HTTPException(status_code=404, detail="Job not found")
+        return state
+
+    async def watch(self, job_id: str) -> AsyncIterator[dict]:
+        """Yields the job's state on every change until it finishes."""
+        last = None
+        while True:
+            job = self.jobs.get(job_id)
+            changed = job.changed if job is not None else None
+            state = job.to_dict() if job is not None else await self.get(job_id)
+            if state != last:
+                yield state
+                last = state
+            if state["status"] in ("completed", "failed"):
+                return
+            if changed is not None:
+                await changed.wait()
+            else:
+                await asyncio.sleep(self.poll_interval)
+
+    async def _changed(self, job: Job):
+        job._touch()
+        if self.store is not None:
+            # The job doesn't change while its next stage waits for this write
+            await asyncio.to_thread(self._save, job)
+
+    def _save(self, job: Job):
+        if self.store is not None:
+            try:
+                self.store.save(job.id, job.to_dict(), self.retention)
+            except Exception as e:
+                logger.warning(f"Could not save job {job.id} to the shared store: {e}")
+
+    async def _expire_store(self):
+        while True:
+            try:
+                await asyncio.to_thread(self.store.expire)
+            except Exception as e:
+                logger.warning(f"Could not expire old jobs in the shared store: {e}")
+            await asyncio.sleep(self.expire_interval)
+
+    def _expire(self):
+        cutoff = time.time() - self.retention
+        for job_id in [job_id for job_id, job in self.jobs.items() if job.finished_at and job.finished_at < cutoff]:
+            del self.jobs[job_id]
+
+    async def _worker(self):
+        while True:
+            job = await self._queue.get()
+            self.in_flight += 1
+            try:
+                with trace(job.trace_id, job.spans):
+                    await self._run(job)
+            finally:
+                # Stage closures can hold the recording; finished jobs are kept for `retention` without them
+                job.stages = []
+                self.in_flight -= 1
+                self._queue.task_done()
+
+    async def _run(self, job: Job):
+        # Time spent waiting for a worker: the number to watch when sizing JOB_WORKERS
+        queued = time.time() - job.created_at
+        STAGE_SECONDS.observe(queued, stage="job_queue_wait", outcome="ok")
+        job.spans.append({"stage": "job_queue_wait", "duration": round(queued, 4), "outcome": "ok"})
+        job.status = "running"
+        await self._changed(job)
+        for name, stage in job.stages:
+            job.stage_status[name] = {"status": "running", "started_at": time.time()}
+            await self._changed(job)
+            try:
+                with span(f"job_{name}"):
+                    await stage(job)
+            except Exception as e:
+                logger.error(f"Job {job.id} (trace {job.trace_id}) failed in stage {name}: {e}")
+                job.stage_status[name].update(status="failed", finished_at=time.time())
+                # Lets callers tell specific failures apart (e.g. a Transcribe job that can't be retried)
+                if getattr(e, "error_code", None):
+                    job.stage_status[name]["error_code"] = e.error_code
+                job.status = "failed"
+                job.error = e.detail if isinstance(e, HTTPException) else str(e)
+                job.finished_at = time.time()
+                await self._changed(job)
+                return
+            job.stage_status[name].update(status="completed", finished_at=time.time())
+            await self._changed(job)
+        job.status = "completed"
+        job.finished_at = time.time()
+        await self._changed(job)
@@ -0,0 +1,70 @@
+import asyncio
+import random
+from typing import Awaitable, Callable, TypeVar
+
+from fastapi import HTTPException
+from agno.utils.log import logger
+
+from metrics import span
+
+T = TypeVar("T")
+
+
+def is_rate_limit_error(error: Exception) -> bool:
+    """Best-effort check for a quota / rate-limit error from the model provider."""
+    if getattr(error, "status_code", None) == 429 or getattr(error, "code", None) == 429:
+        return True
+    message = str(error).lower()
+    return "429" in message or "resource_exhausted" in message or "rate limit" in message or "quota" in message
+
+
+class ModelLimiter:
+    """Caps concurrent model calls, queues the rest and retries rate-limited calls.
+
+    At most `max_concurrency` calls run at once and at most `max_queue` wait for a
+    slot; anything beyond that is rejected with a 503 instead of piling up. Each
+    attempt is bounded by `timeout` seconds, and rate-limit errors are retried with
+    full-jitter exponential backoff.
+    """
+
+    def __init__(self, max_concurrency: int = 8, max_queue: int = 100, timeout: float = 60,
+                 retries: int = 4, base_delay: float = 1.0, max_delay: float = 30.0):
+        self.max_concurrency = max_concurrency
+        self.max_queue = max_queue
+        self.timeout = timeout
+        self.retries = retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self._semaphore = None
+        self.waiting = 0
+        self.running = 0
+
+    async def run(self, call: Callable[[], Awaitable[T]]) -> T:
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.max_concurrency)
+        if self.waiting >= self.max_queue:
+            raise HTTPException(status_code=503, detail="Analysis queue is full, please retry shortly.")
+
+        self.waiting += 1
+        try:
+            with span("model_queue_wait"):
+                await self._semaphore.acquire()
+        finally:
+            self.waiting -= 1
+
+        self.running += 1
+        try:
+            for attempt in range(self.retries + 1):
+                try:
+                    return await asyncio.wait_for(call(), self.timeout)
+                except asyncio.TimeoutError:
+                    raise HTTPException(status_code=504, detail="Timed out waiting for the model.")
+                except Exception as e:
+                    if attempt == self.retries or not is_rate_limit_error(e):
+                        raise
+                    delay = random.uniform(0, min(self.max_delay, self.base_delay * 2 ** attempt))
+                    logger.warning(f"Model rate limited, retrying in {delay:.1f}s: {e}")
+                    await asyncio.sleep(delay)
+        finally:
+            self.running -= 1
+            self._semaphore.release()
@@ -0,0 +1,84 @@
+import asyncio
+from typing import AsyncIterator, List
+
+import numpy as np
+
+SAMPLE_RATE = 16000
+
+
+def pcm16_to_float(pcm: bytes, sample_rate: int = SAMPLE_RATE) -> np.ndarray:
+    """Converts little-endian 16-bit mono PCM to 16 kHz float32 samples."""
+    samples = np.frombuffer(pcm, dtype="<i2").astype(np.float32) / 32768.0
+    if sample_rate != SAMPLE_RATE and len(samples):
+        target = int(len(samples) * SAMPLE_RATE / sample_rate)
+        samples = np.interp(
+            np.linspace(0, len(samples) - 1, target), np.arange(len(samples)), samples
+        ).astype(np.float32)
+    return samples
+
+
+def quiet_cut(samples: np.ndarray, window: int, search: int = 2 * SAMPLE_RATE, frame: int = SAMPLE_RATE // 10) -> int:
+    """Picks a cut point near `window` at the quietest 100 ms frame, so words are rarely split."""
+    start = max(window - search, 0)
+    best, best_energy = window, None
+    for offset in range(start, window - frame + 1, frame):
+        energy = float(np.mean(samples[offset:offset + frame] ** 2))
+        if best_energy is None or energy < best_energy:
+            best, best_energy = offset + frame // 2, energy
+    return best
+
+
+class LiveTranscript:
+    """Rolling transcript of a recording that is still in progress.
+
+    Incoming audio is buffered and cut into windows of about `window_seconds`
+    (at a quiet point), and each window is transcribed on the backend's pool as
+    soon as it is complete. `updates()` yields the transcript so far each time a
+    window finishes; after `finish()` only the last partial window is left to decode.
+    """
+
+    def __init__(self, backend, sample_rate: int = SAMPLE_RATE, window_seconds: float = 10):
+        self.backend = backend
+        self.sample_rate = sample_rate
+        self.window = int(window_seconds * SAMPLE_RATE)
+        self.texts: List[str] = []
+        self._buffer = np.zeros(0, dtype=np.float32)
+        self._pending: asyncio.Queue = asyncio.Queue()
+        self._tasks: List[asyncio.Future] = []
+
+    @property
+    def transcript(self) -> str:
+        return " ".join(self.texts)
+
+    def _dispatch(self, samples: np.ndarray):
+        task = asyncio.ensure_future(self.backend.transcribe_samples(samples))
+        self._tasks.append(task)
+        self._pending.put_nowait(task)
+
+    def feed(self, pcm: bytes):
+        self._buffer = np.concatenate([self._buffer, pcm16_to_float(pcm, self.sample_rate)])
+        while len(self._buffer) >= self.window:
+            cut = quiet_cut(self._buffer, self.window)
+            self._dispatch(self._buffer[:cut])
+            self._buffer = self._buffer[cut:]
+
+    def finish(self):
+        """Flushes the remaining audio; `updates()` ends once it has been transcribed."""
+        if len(self._buffer):
+            self._dispatch(self._buffer)
+            self._buffer = np.zeros(0, dtype=np.float32)
+        self._pending.put_nowait(None)
+
+    async def updates(self) -> AsyncIterator[str]:
+        while True:
+            task = await self._pending.get()
+            if task is None:
+                return
+            text = await task
+            if text:
+                self.texts.append(text)
+            yield self.transcript
+
+    def cancel(self):
+        for task in self._tasks:
+            task.cancel()
@@ -2,46 +2,106 @@ import gradio as gr
 import requests
 import os
 import time
+import json
+import uuid
+from urllib.parse import urlencode
+from websockets.sync.client import connect
 
 UPLOAD_URL = "http://127.0.0.1:8000/upload-audio/"
-ANALYZE_URL = "http://127.0.0.1:8000/analyze-interview/"
+JOB_URL = "http://127.0.0.1:8000/jobs/{job_id}"
+SPEECH_URL = "http://127.0.0.1:8000/jobs/{job_id}/speech"
+LIVE_URL = "ws://127.0.0.1:8000/live-interview"
+QUESTION = "Tell me about yourself"
 
-def process_interview(name, college, branch, audio_file):
-    """Uploads the audio and analyzes the interview."""
+def trace_headers():
+    """Starts a new trace; the server tags every log line, span and job of this interview with it."""
+    return {"X-Trace-Id": uuid.uuid4().hex}
+
+def wait_for_job(job_id, timeout=900, headers=None):
+    """Polls the job status endpoint until the background pipeline finishes."""
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        job = requests.get(JOB_URL.format(job_id=job_id), headers=headers).json()
+        if job["status"] in ("completed", "failed"):
+            return job
+        time.sleep(1)
+    return None
+
+def process_interview(stud_id, audio_file):
+    """Uploads the audio, analyzes the interview and streams back the AI response audio."""
     if not audio_file:
-        return "Please record your response.", None
+        yield "Please record your response.", None
+        return
     
+    headers = trace_headers()
     files = {"audio": open(audio_file, "rb")}
-    response = requests.post(UPLOAD_URL, files=files)
+    response = requests.post(UPLOAD_URL, files=files, headers=headers,
+                             params={"stud_id": stud_id, "question": QUESTION, "stream_tts": True})
     if response.status_code != 200:
-        return "Error uploading audio.", None
-    time.sleep(5) 
-    job_name = response.json().get("job_name")
-    print(job_name)
+        yield "Error uploading audio.", None
+        return
+    job_id = response.json().get("job_id")
+    print(job_id, "trace", headers["X-Trace-Id"])
 
-    # Wait for transcription
-    
-    # payload = {"job_name": job_name, "candidate_name": name, "college": college, "branch": branch}
-    # analysis_response = requests.post(ANALYZE_URL, json=payload)
-    analysis_response = requests.post(
-    ANALYZE_URL, 
-    params={  # Use `params` instead of `json`
-        "job_name": job_name,
-        "candidate_name": name,
-        "college": college,
-        "branch": branch
-    }
-    )
-    if analysis_response.status_code != 200:
-        print("Response:", analysis_response.text)  # This will show FastAPI's error message
-        return "Error analyzing interview.", None
-    
-    result = analysis_response.json()
-    ratings = result[0]
-    feedback = result[1]
-    audio_output = result[2]
+    # Wait for transcription and analysis to finish on the server
+    job = wait_for_job(job_id, headers=headers)
+    if job is None or job["status"] != "completed":
+        print("Job:", job)  # This will show the failed stage and error message
+        yield "Error analyzing interview.", None
+        return
     
-    output_text = f"""
+    result = job["result"]
+    output_text = format_analysis(result["ratings"], result["feedback"])
+    yield output_text, None
+
+    # Play the AI response sentence by sentence while the rest is still being synthesized
+    with requests.get(SPEECH_URL.format(job_id=job_id), headers=headers, stream=True) as speech:
+        for audio_chunk in speech.iter_content(chunk_size=None):
+            yield output_text, audio_chunk
+
+def stream_chunk(stud_id, chunk, connection, transcript):
+    """Forwards a microphone chunk to the live endpoint and returns the rolling transcript."""
+    sample_rate, samples = chunk
+    if samples.ndim > 1:
+        samples = samples.mean(axis=1)
+    if samples.dtype.kind == "f":
+        samples = samples * 32767
+    if connection is None:
+        params = urlencode({"stud_id": stud_id, "question": QUESTION, "sample_rate": sample_rate})
+        connection = connect(f"{LIVE_URL}?{params}", additional_headers=trace_headers())
+    connection.send(samples.astype("<i2").tobytes())
+
+    # Pick up any partial transcripts without holding up the stream
+    while True:
+        try:
+            message = json.loads(connection.recv(timeout=0))
+        except TimeoutError:
+            break
+        if message["event"] == "partial":
+            transcript = message["transcript"]
+    return connection, transcript
+
+def finish_live(connection, transcript):
+    """Tells the live endpoint the answer is over and waits for the analysis."""
+    if connection is None:
+        return None, transcript, "Please record your response.", None
+    connection.send(json.dumps({"event": "stop"}))
+    message = {}
+    for raw in connection:
+        message = json.loads(raw)
+        if message["event"] == "partial":
+            transcript = message["transcript"]
+        else:
+            break
+    connection.close()
+    if message.get("event") != "final":
+        print("Live error:", message)  # This will show the server's error message
+        return None, transcript, "Error analyzing interview.", None
+    return None, message["transcript"], format_analysis(message["ratings"], message["feedback"]), message["audio_url"]
+
+def format_analysis(ratings, feedback):
+    """Formats ratings and feedback for display."""
+    return f"""
     **Interview Analysis:**
     - Clarity: {ratings['clarity']}/10
     - Structure: {ratings['structure']}/10
@@ -55,8 +115,6 @@ def process_interview(name, college, branch, audio_file):
     - Areas for Improvement: {feedback['improvements']}
     - Suggestions: {feedback['suggestions']}
     """
-    
-    return output_text, audio_output
 
 
 gui = gr.Blocks(theme='NoCrypt/miku')
@@ -65,16 +123,26 @@ with gui:
     gr.Markdown("**Question: Tell me about yourself**")
     
     with gr.Row():
-        name = gr.Textbox(label="Candidate Name")
-        college = gr.Textbox(label="College")
-        branch = gr.Textbox(label="Branch")
-    
-    audio = gr.Audio(sources="microphone", type="filepath", label="Record your response")
+        stud_id = gr.Textbox(label="Student ID")
     
-    analyze_button = gr.Button("Submit Response")
-    output_text = gr.Textbox(label="Interview Analysis")
-    audio_output = gr.Audio(label="AI Response Audio")
-    
-    analyze_button.click(process_interview, inputs=[name, college, branch, audio], outputs=[output_text, audio_output])
+    with gr.Tab("Record & Submit"):
+        audio = gr.Audio(sources="microphone", type="filepath", label="Record your response")
+        
+        analyze_button = gr.Button("Submit Response")
+        output_text = gr.Textbox(label="Interview Analysis")
+        audio_output = gr.Audio(label="AI Response Audio", streaming=True, autoplay=True)
+        
+        analyze_button.click(process_interview, inputs=[stud_id, audio], outputs=[output_text, audio_output])
+
+    # Transcribed while you speak; only the evaluation is left when you stop recording
+    with gr.Tab("Live"):
+        connection = gr.State(None)
+        live_audio = gr.Audio(sources="microphone", streaming=True, label="Speak your response")
+        live_transcript = gr.Textbox(label="Live Transcript")
+        live_output = gr.Textbox(label="Interview Analysis")
+        live_audio_output = gr.Audio(label="AI Response Audio", autoplay=True)
+
+        live_audio.stream(stream_chunk, inputs=[stud_id, live_audio, connection, live_transcript], outputs=[connection, live_transcript])
+        live_audio.stop_recording(finish_live, inputs=[connection, live_transcript], outputs=[connection, live_transcript, live_output, live_audio_output])
 
 gui.launch()
@@ -0,0 +1,194 @@
+import contextvars
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from typing import Callable, Dict, List, Optional, Tuple
+
+from agno.utils.log import logger
+
+# Trace ID of the request or job being handled, and the list its spans are collected in.
+# asyncio tasks and asyncio.to_thread copy both, so spans recorded anywhere downstream
+# end up with the right request.
+trace_id_var: contextvars.ContextVar[Optional[str]] = contextvars.ContextVar("trace_id", default=None)
+spans_var: contextvars.ContextVar[Optional[List[dict]]] = contextvars.ContextVar("spans", default=None)
+
+# Seconds; covers a fast cache hit up to a slow Transcribe job
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 20, 30, 60, 120, 300)
+
+LabelKey = Tuple[Tuple[str, str], ...]
+
+
+def new_trace_id() -> str:
+    return uuid.uuid4().hex
+
+
+def _label_key(labels: dict) -> LabelKey:
+    return tuple(sorted((k, str(v)) for k, v in labels.items()))
+
+
+def _format_labels(key: LabelKey, extra: Optional[Tuple[str, str]] = None) -> str:
+    pairs = list(key) + ([extra] if extra else [])
+    if not pairs:
+        return ""
+    escaped = (v.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n") for _, v in pairs)
+    return "{" + ",".join(f'{k}="{v}"' for (k, _), v in zip(pairs, escaped)) + "}"
+
+
+class Counter:
+    def __init__(self, name: str, help: str):
+        self.name = name
+        self.help = help
+        self._values: Dict[LabelKey, float] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount: float = 1, **labels):
+        key = _label_key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            for key, value in sorted(self._values.items()):
+                lines.append(f"{self.name}{_format_labels(key)} {value:g}")
+        return lines
+
+
+class Histogram:
+    def __init__(self, name: str, help: str, buckets=DEFAULT_BUCKETS):
+        self.name = name
+        self.help = help
+        self.buckets = tuple(sorted(buckets))
+        self._counts: Dict[LabelKey, List[int]] = {}
+        self._sums: Dict[LabelKey, float] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, **labels):
+        key = _label_key(labels)
+        with self._lock:
+            counts = self._counts.setdefault(key, [0] * (len(self.buckets) + 1))
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    counts[i] += 1
+            counts[-1] += 1
+            self._sums[key] = self._sums.get(key, 0.0) + value
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            for key, counts in sorted(self._counts.items()):
+                for bound, count in zip(self.buckets, counts):
+                    lines.append(f"{self.name}_bucket{_format_labels(key, ('le', f'{bound:g}'))} {count}")
+                lines.append(f"{self.name}_bucket{_format_labels(key, ('le', '+Inf'))} {counts[-1]}")
+                lines.append(f"{self.name}_sum{_format_labels(key)} {self._sums[key]:g}")
+                lines.append(f"{self.name}_count{_format_labels(key)} {counts[-1]}")
+        return lines
+
+
+class Gauge:
+    """A value read from `read` at scrape time, e.g. a queue length."""
+
+    def __init__(self, name: str, help: str, read: Callable[[], float]):
+        self.name = name
+        self.help = help
+        self.read = read
+
+    def render(self) -> List[str]:
+        try:
+            value = float(self.read())
+        except Exception as e:
+            logger.warning(f"Could not read gauge {self.name}: {e}")
+            return []
+        return [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} gauge", f"{self.name} {value:g}"]
+
+
+class Registry:
+    """Metrics kept in process memory and rendered in the Prometheus text format."""
+
+    def __init__(self):
+        self._metrics = {}
+
+    def _register(self, metric):
+        self._metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name: str, help: str) -> Counter:
+        return self._metrics.get(name) or self._register(Counter(name, help))
+
+    def histogram(self, name: str, help: str, buckets=DEFAULT_BUCKETS) -> Histogram:
+        return self._metrics.get(name) or self._register(Histogram(name, help, buckets))
+
+    def gauge(self, name: str, help: str, read: Callable[[], float]) -> Gauge:
+        return self._register(Gauge(name, help, read))
+
+    def render(self) -> str:
+        lines = []
+        for metric in self._metrics.values():
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = Registry()
+STAGE_SECONDS = REGISTRY.histogram("interview_stage_seconds", "Time spent in each pipeline stage.")
+MODEL_TOKENS = REGISTRY.counter("interview_model_tokens_total", "Tokens used by model calls.")
+MODEL_CALL_TOKENS = REGISTRY.histogram(
+    "interview_model_call_tokens", "Tokens per model call.", buckets=(100, 250, 500, 1000, 2000, 4000, 8000, 16000, 32000)
+)
+
+
+@contextmanager
+def span(stage: str, **attributes):
+    """Times a pipeline stage into STAGE_SECONDS and the current trace's span list.
+
+    Yields the span's attributes, so the stage can add what it learns (e.g. token counts).
+    """
+    outcome = "ok"
+    start = time.perf_counter()
+    try:
+        yield attributes
+    except BaseException:
+        outcome = "error"
+        raise
+    finally:
+        duration = time.perf_counter() - start
+        STAGE_SECONDS.observe(duration, stage=stage, outcome=outcome)
+        spans = spans_var.get()
+        if spans is not None:
+            spans.append({"stage": stage, "duration": round(duration, 4), "outcome": outcome, **attributes})
+        logger.debug(f"trace={trace_id_var.get()} stage={stage} outcome={outcome} duration={duration:.3f}s")
+
+
+@contextmanager
+def trace(trace_id: Optional[str] = None, spans: Optional[List[dict]] = None):
+    """Makes `trace_id` (or a new one) current and collects spans into `spans`."""
+    trace_token = trace_id_var.set(trace_id or new_trace_id())
+    spans_token = spans_var.set(spans if spans is not None else [])
+    try:
+        yield spans_var.get()
+    finally:
+        trace_id_var.reset(trace_token)
+        spans_var.reset(spans_token)
+
+
+def record_tokens(response, model: str) -> Dict[str, int]:
+    """Records the input/output token counts of an agent run and returns them."""
+    counts = {}
+    run_metrics = getattr(response, "metrics", None)
+    if run_metrics is None:
+        return counts
+    for kind in ("input_tokens", "output_tokens"):
+        value = run_metrics.get(kind) if isinstance(run_metrics, dict) else getattr(run_metrics, kind, None)
+        # Older agno releases keep one entry per model call
+        if isinstance(value, list):
+            value = sum(v or 0 for v in value)
+        if value:
+            counts[kind] = value
+            MODEL_TOKENS.inc(value, model=model, kind=kind.split("_")[0])
+            MODEL_CALL_TOKENS.observe(value, model=model, kind=kind.split("_")[0])
+    return counts
+
+
+def server_timing(spans: List[dict]) -> str:
+    """Formats spans as a Server-Timing header (durations in milliseconds)."""
+    return ", ".join(f"{s['stage']};dur={s['duration'] * 1000:.1f}" for s in spans)
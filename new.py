@@ -1,22 +1,41 @@
 import os
+import io
 import time
-import shutil
 import json
+import asyncio
+import re
+import uuid
 from pathlib import Path
-from fastapi import FastAPI, UploadFile, File, HTTPException
+from typing import List, Optional, Union
+from fastapi import FastAPI, UploadFile, File, HTTPException, Request, WebSocket, WebSocketDisconnect
+from fastapi.responses import FileResponse, PlainTextResponse, StreamingResponse
 from pydantic import BaseModel
+from contextlib import asynccontextmanager
 from dotenv import load_dotenv
-from agno.agent import Agent
-from agno.media import Audio
-from agno.models.google import Gemini
 from agno.utils.log import logger
-import pyttsx3
-from gtts import gTTS  
-import boto3
 import requests
-
-# Initialize text-to-speech engine
-engine = pyttsx3.init()
+from services import LazyService
+from transcription import (AwsTranscribeBackend, LocalWhisperBackend, TranscriptionJobGone, TranscriptionWaiter,
+                           is_sns_url, job_names_from_event, verify_sns_message)
+from jobs import JobManager
+from job_store import open_job_store
+from storage import stream_to_s3
+from dedup import UploadIndex, hash_file
+from limiter import ModelLimiter
+from tts import MEDIA_TYPES, SpeechRenderer, stream_speech
+from result_cache import ResultCache, analysis_key
+from audio import check_duration, compress_for_model, preprocess_audio, wav_duration
+from prompts import (PROMPT_VERSION, AudioModelAnalysis, BatchAnalysis, InterviewAnalysis, ModelAnalysis,
+                     audio_prompt, batch_prompt, complete_analysis, transcript_prompt)
+from metrics import REGISTRY, record_tokens, server_timing, span, trace, trace_id_var
+
+def init_tts_engine():
+    """Starts the local text-to-speech engine (espeak driver), only needed as a gTTS fallback."""
+    import pyttsx3
+    return pyttsx3.init()
+
+# Initialize text-to-speech engine on first use
+engine = LazyService(init_tts_engine)
 
 # Load environment variables
 load_dotenv()
@@ -25,8 +44,39 @@ if not GOOGLE_API_KEY:
     raise ValueError("Error: GOOGLE_API_KEY is not set in environment variables.")
 os.environ["GOOGLE_API_KEY"] = GOOGLE_API_KEY
 
+WARM_SERVICES = os.getenv("WARM_SERVICES", "1") == "1"
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Warms the heavy clients in the background so startup isn't blocked but the first request is fast."""
+    if WARM_SERVICES:
+        asyncio.get_running_loop().run_in_executor(None, warm_services)
+    # Every worker runs this; it is idempotent and serialized in Postgres
+    asyncio.get_running_loop().run_in_executor(None, result_store.create_schema)
+    yield
+    db_pool.close()
+    transcription_backend.close()
+
 # Create FastAPI app
-app = FastAPI()
+app = FastAPI(lifespan=lifespan)
+
+HTTP_SECONDS = REGISTRY.histogram("interview_http_request_seconds", "Time to response headers per endpoint.")
+
+@app.middleware("http")
+async def trace_requests(request: Request, call_next):
+    """Runs each request under a trace ID (the client's X-Trace-Id if sent) and reports its stage timings."""
+    with trace(request.headers.get("x-trace-id")) as spans:
+        start = time.perf_counter()
+        response = await call_next(request)
+        route = request.scope.get("route")
+        HTTP_SECONDS.observe(
+            time.perf_counter() - start, method=request.method,
+            route=getattr(route, "path", "unmatched"), status=response.status_code,
+        )
+        response.headers["X-Trace-Id"] = trace_id_var.get()
+        if spans:
+            response.headers["Server-Timing"] = server_timing(spans)
+    return response
 
 # AWS Credentials
 AWS_ACCESS_KEY_ID = os.getenv("AWS_ACCESS_KEY_ID")
@@ -38,216 +88,760 @@ S3_BUCKET_NAME = os.getenv("S3_BUCKET_NAME")
 if not all([AWS_ACCESS_KEY_ID, AWS_SECRET_ACCESS_KEY, AWS_REGION, S3_BUCKET_NAME]):
     raise ValueError("Error: AWS credentials or S3 bucket name not set in environment variables.")
 
-s3_client = boto3.client(
-    "s3",
-    aws_access_key_id=AWS_ACCESS_KEY_ID,
-    aws_secret_access_key=AWS_SECRET_ACCESS_KEY,
-    region_name=AWS_REGION
+def aws_client(service_name: str):
+    """Creates a boto3 client for `service_name`."""
+    import boto3
+    return boto3.client(
+        service_name,
+        aws_access_key_id=AWS_ACCESS_KEY_ID,
+        aws_secret_access_key=AWS_SECRET_ACCESS_KEY,
+        region_name=AWS_REGION
+    )
+
+s3_client = LazyService(lambda: aws_client("s3"))
+transcribe_client = LazyService(lambda: aws_client("transcribe"))
+
+# Job state and Transcribe notifications shared by all worker processes: a SQLite file
+# on one host, or a redis:// URL across hosts
+JOB_STORE = os.getenv("JOB_STORE", "jobs.db")
+job_store = open_job_store(JOB_STORE)
+
+# Shared, non-blocking waiter for Transcribe jobs
+TRANSCRIBE_POLL_MIN_SECONDS = float(os.getenv("TRANSCRIBE_POLL_MIN_SECONDS", "1"))
+TRANSCRIBE_POLL_MAX_SECONDS = float(os.getenv("TRANSCRIBE_POLL_MAX_SECONDS", "15"))
+TRANSCRIBE_WAIT_TIMEOUT = float(os.getenv("TRANSCRIBE_WAIT_TIMEOUT", "900"))
+# How long a job may be unknown to Transcribe (not started yet) before it counts as missing
+TRANSCRIBE_NOT_FOUND_GRACE = float(os.getenv("TRANSCRIBE_NOT_FOUND_GRACE", "30"))
+transcription_waiter = TranscriptionWaiter(
+    transcribe_client,
+    min_interval=TRANSCRIBE_POLL_MIN_SECONDS,
+    max_interval=TRANSCRIBE_POLL_MAX_SECONDS,
+    not_found_grace=TRANSCRIBE_NOT_FOUND_GRACE,
+    shared=job_store,
 )
 
-transcribe_client = boto3.client(
-    "transcribe",
-    aws_access_key_id=AWS_ACCESS_KEY_ID,
-    aws_secret_access_key=AWS_SECRET_ACCESS_KEY,
-    region_name=AWS_REGION
+# Transcription backend: "aws" (S3 + Transcribe) or "local" (offline faster-whisper)
+TRANSCRIPTION_BACKEND = os.getenv("TRANSCRIPTION_BACKEND", "aws")
+if TRANSCRIPTION_BACKEND == "local":
+    transcription_backend = LocalWhisperBackend(
+        model_size=os.getenv("WHISPER_MODEL_SIZE", "base.en"),
+        workers=int(os.getenv("WHISPER_WORKERS", "2")),
+        chunk_seconds=float(os.getenv("WHISPER_CHUNK_SECONDS", "30")),
+        compute_type=os.getenv("WHISPER_COMPUTE_TYPE", "int8"),
+    )
+elif TRANSCRIPTION_BACKEND == "aws":
+    # Live (streaming) transcription is only available with the local backend
+    transcription_backend = AwsTranscribeBackend(transcription_waiter, timeout=TRANSCRIBE_WAIT_TIMEOUT)
+else:
+    raise ValueError(f"Error: unknown TRANSCRIPTION_BACKEND '{TRANSCRIPTION_BACKEND}'.")
+
+# Live recordings are transcribed in windows of about this many seconds
+LIVE_WINDOW_SECONDS = float(os.getenv("LIVE_WINDOW_SECONDS", "10"))
+
+# Background pipeline: bounded worker pool plus a bounded backlog queue
+JOB_WORKERS = int(os.getenv("JOB_WORKERS", "4"))
+JOB_QUEUE_SIZE = int(os.getenv("JOB_QUEUE_SIZE", "1000"))
+job_manager = JobManager(
+    workers=JOB_WORKERS,
+    max_queue=JOB_QUEUE_SIZE,
+    store=job_store,
+    poll_interval=float(os.getenv("JOB_POLL_SECONDS", "0.5")),
 )
 
-TEMP_DIR = "temp"
-os.makedirs(TEMP_DIR, exist_ok=True)
-
-class Ratings(BaseModel):
-    clarity: float
-    structure: float
-    confidence: float
-    relevance: float
-    communication: float
-    overall_rating: float
-
-class Feedback(BaseModel):
-    strengths: str
-    improvements: str
-    suggestions: str
-
-class InterviewAnalysis(BaseModel):
-    transcript: str
-    ratings: Ratings
-    feedback: Feedback
-    candidate_response: str
-
-model = Gemini(id="gemini-2.0-flash-exp")
-agent = Agent(
-    model=model,
-    markdown=True,
-    response_model=InterviewAnalysis,
-    structured_outputs=True,
+# Uploads are streamed straight to S3; Starlette's spooled upload file is the only
+# local buffer (memory first, then a self-deleting temp file)
+S3_PART_SIZE_MB = int(os.getenv("S3_PART_SIZE_MB", "8"))
+S3_UPLOAD_CONCURRENCY = int(os.getenv("S3_UPLOAD_CONCURRENCY", "4"))
+
+# Audio normalization before upload (needs ffmpeg; falls back to the raw upload without it)
+AUDIO_PREPROCESS = os.getenv("AUDIO_PREPROCESS", "1") == "1"
+AUDIO_FORMAT = os.getenv("AUDIO_FORMAT", "flac")  # flac, opus or wav
+AUDIO_MAX_SECONDS = float(os.getenv("AUDIO_MAX_SECONDS", "600"))
+# Checked before an upload is read or decoded; compressed formats can't be timed from their header
+AUDIO_MAX_MB = int(os.getenv("AUDIO_MAX_MB", "100"))
+AUDIO_SILENCE_THRESH_DB = float(os.getenv("AUDIO_SILENCE_THRESH_DB", "-45"))
+
+# Content hash -> S3 key / Transcribe job / transcript, so retries skip re-transcription
+UPLOAD_INDEX_PATH = os.getenv("UPLOAD_INDEX_PATH", "uploads.db")
+upload_index = UploadIndex(UPLOAD_INDEX_PATH)
+
+class BatchItem(BaseModel):
+    job_name: str
+    stud_id: str
+    question: str
+
+MODEL_ID = "gemini-2.0-flash-exp"
+
+def init_model():
+    """Creates the Gemini model (imports the Google SDK, which is slow)."""
+    from agno.models.google import Gemini
+    return Gemini(id=MODEL_ID)
+
+model = LazyService(init_model)
+
+def create_agent(response_model=ModelAnalysis):
+    """Builds an agent per call; Agent keeps per-run state, so one instance can't serve concurrent runs."""
+    from agno.agent import Agent
+    return Agent(
+        model=model.get(),
+        markdown=True,
+        response_model=response_model,
+        structured_outputs=True,
+    )
+
+# All model calls go through one limiter: bounded concurrency, bounded queue,
+# per-call timeout and jittered retries on rate-limit errors
+model_limiter = ModelLimiter(
+    max_concurrency=int(os.getenv("GEMINI_MAX_CONCURRENCY", "8")),
+    max_queue=int(os.getenv("GEMINI_MAX_QUEUE", "100")),
+    timeout=float(os.getenv("GEMINI_TIMEOUT", "60")),
+    retries=int(os.getenv("GEMINI_MAX_RETRIES", "4")),
+)
+def warm_services():
+    """Creates the AWS clients and the model, and imports the agent, ahead of the first request."""
+    for service in (s3_client, transcribe_client, model):
+        try:
+            service.get()
+        except Exception as e:
+            logger.warning(f"Warm-up failed, will retry on first use: {e}")
+    import agno.agent  # noqa: F401
+
+# Two-tier cache of analysis results (in-process LRU + SQLite)
+analysis_cache = ResultCache(
+    os.getenv("ANALYSIS_CACHE_PATH", "analysis_cache.db"),
+    maxsize=int(os.getenv("ANALYSIS_CACHE_SIZE", "1024")),
+    ttl=float(os.getenv("ANALYSIS_CACHE_TTL", str(7 * 24 * 3600))),
 )
 
-def text_to_speech(text: str) -> str:
-    """Converts chatbot response to speech using gTTS."""
-    tts = gTTS(text=text, lang='en')
-    output_path = ("/app/output.mp3")
-    tts.save(output_path)
-    return output_path
-
-def save_audio_file(audio: UploadFile) -> str:
-    """Saves uploaded audio to a temp folder and returns the file path."""
-    filename = f"audio_{int(time.time())}.wav"
-    file_path = os.path.join(TEMP_DIR, filename)
-    with open(file_path, "wb") as buffer:
-        shutil.copyfileobj(audio.file, buffer)
-    return file_path, filename
-
-def upload_to_s3(file_path: str, filename: str):
-    """Uploads file to S3."""
-    if not file_path or not filename:
-        raise ValueError("File path or filename is missing")
-    s3_client.upload_file(file_path, S3_BUCKET_NAME, filename)
-
-def get_transcription_result(job_name: str) -> str:
-    """Waits for transcription to complete and returns the transcript."""
-    while True:
-        response = transcribe_client.get_transcription_job(TranscriptionJobName=job_name)
-        status = response["TranscriptionJob"]["TranscriptionJobStatus"]
-        if status == "COMPLETED":
-            transcript_url = response["TranscriptionJob"]["Transcript"]["TranscriptFileUri"]
-            break
-        elif status == "FAILED":
-            raise HTTPException(status_code=500, detail="Transcription job failed.")
-        time.sleep(5)
+# Recordings up to this length are sent straight to the model in "auto" mode
+DIRECT_AUDIO_MAX_SECONDS = float(os.getenv("DIRECT_AUDIO_MAX_SECONDS", "180"))
+
+# Transcripts packed into a single model request in batch mode
+BATCH_PACK_SIZE = int(os.getenv("BATCH_PACK_SIZE", "5"))
+
+# Text-to-speech renderings, cached on disk by content hash of (text, voice, lang)
+TTS_CACHE_DIR = os.getenv("TTS_CACHE_DIR", "tts_cache")
+TTS_CACHE_MAX_MB = int(os.getenv("TTS_CACHE_MAX_MB", "512"))
+TTS_GTTS_TIMEOUT = float(os.getenv("TTS_GTTS_TIMEOUT", "10"))
+TTS_S3_PREFIX = os.getenv("TTS_S3_PREFIX")  # when set, responses get pre-signed S3 URLs
+TTS_URL_EXPIRY = int(os.getenv("TTS_URL_EXPIRY", "3600"))
+PUBLIC_BASE_URL = os.getenv("PUBLIC_BASE_URL", "http://127.0.0.1:8000")
+TTS_STREAM_WORKERS = int(os.getenv("TTS_STREAM_WORKERS", "4"))
+speech_renderer = SpeechRenderer(
+    TTS_CACHE_DIR,
+    max_bytes=TTS_CACHE_MAX_MB * 1024 * 1024,
+    gtts_timeout=TTS_GTTS_TIMEOUT,
+    fallback_engine=engine,
+)
 
-    transcript_response = requests.get(transcript_url)
-    transcript_data = transcript_response.json()
-    transcript_text = transcript_data["results"]["transcripts"][0]["transcript"]
-    return transcript_text
+def text_to_speech(text: str, lang: str = "en", voice: str = "com") -> str:
+    """Converts chatbot response to speech and returns a URL the client can fetch it from."""
+    with span("tts"):
+        key, path = speech_renderer.render(text, lang=lang, voice=voice)
+    if not TTS_S3_PREFIX:
+        return f"{PUBLIC_BASE_URL}/tts/{key}"
 
-import os
-import psycopg2
-import pandas as pd
-from fastapi import FastAPI, HTTPException
-from dotenv import load_dotenv
+    s3_key = f"{TTS_S3_PREFIX.rstrip('/')}/{os.path.basename(path)}"
+    try:
+        s3_client.head_object(Bucket=S3_BUCKET_NAME, Key=s3_key)
+    except s3_client.exceptions.ClientError:
+        s3_client.upload_file(path, S3_BUCKET_NAME, s3_key, ExtraArgs={"ContentType": MEDIA_TYPES[Path(path).suffix]})
+    return s3_client.generate_presigned_url(
+        "get_object", Params={"Bucket": S3_BUCKET_NAME, "Key": s3_key}, ExpiresIn=TTS_URL_EXPIRY
+    )
+
+@app.get("/tts/{key}")
+def get_speech(key: str):
+    """Streams a cached TTS rendering."""
+    path = speech_renderer.lookup(key) if re.fullmatch(r"[0-9a-f]{64}", key) else None
+    if path is None:
+        raise HTTPException(status_code=404, detail="Audio not found")
+    return FileResponse(path, media_type=MEDIA_TYPES[Path(path).suffix])
+
+def audio_filename(sha256: str, extension: str = ".wav", retry: bool = False) -> str:
+    """Returns the content-addressed S3 key for a recording (with a unique suffix when re-uploading it)."""
+    suffix = f"-{uuid.uuid4().hex[:8]}" if retry else ""
+    return f"audio_{sha256[:32]}{suffix}{extension}"
+
+async def upload_to_s3(audio: Union[UploadFile, bytes], filename: str) -> dict:
+    """Streams the uploaded audio (or already-processed bytes) to S3 in chunks and returns its key and size."""
+    if not filename:
+        raise ValueError("Filename is missing")
+    if isinstance(audio, bytes):
+        buffer = io.BytesIO(audio)
+
+        async def read(size: int) -> bytes:
+            return buffer.read(size)
+    else:
+        read = audio.read
+    with span("s3_upload"):
+        return await stream_to_s3(
+            s3_client, S3_BUCKET_NAME, filename, read,
+            part_size=S3_PART_SIZE_MB * 1024 * 1024, parallelism=S3_UPLOAD_CONCURRENCY,
+        )
 
-# Load environment variables
-load_dotenv()
+async def get_transcription_result(job_name: str, audio: Optional[bytes] = None) -> str:
+    """Waits (without blocking the event loop) for transcription to complete and returns the transcript."""
+    transcript = upload_index.get_transcript(job_name)
+    if transcript is None:
+        with span("transcribe", backend=transcription_backend.name):
+            transcript = await transcription_backend.transcribe(job_name, audio)
+        upload_index.set_transcript(job_name, transcript)
+    return transcript
+
+@app.post("/transcription-events/")
+async def transcription_events(request: Request):
+    """Receives Transcribe completion notifications (SNS, EventBridge or S3 events)."""
+    payload = json.loads(await request.body() or b"{}")
+
+    # SNS asks us to confirm the HTTP subscription once. Only genuine, signed requests
+    # pointing back at SNS are followed, so this can't be used to make us fetch other URLs.
+    if payload.get("Type") == "SubscriptionConfirmation":
+        if not is_sns_url(payload.get("SubscribeURL")) or not await asyncio.to_thread(verify_sns_message, payload):
+            raise HTTPException(status_code=403, detail="Invalid subscription confirmation.")
+        await asyncio.to_thread(requests.get, payload["SubscribeURL"], timeout=10)
+        return {"message": "Subscription confirmed."}
+
+    # Whichever worker process waits for the job picks this up, through the job store
+    job_names = job_names_from_event(payload)
+    await transcription_waiter.notify(job_names)
+    return {"message": "Notification received.", "job_names": job_names}
+
+import psycopg2
+from db import DatabasePool, TTLCache
+from analytics import (COLLEGE_AVERAGES_QUERY, COLLEGE_DISTRIBUTION_QUERY, COLLEGE_MOST_IMPROVED_QUERY,
+                       DEPARTMENT_AVERAGES_QUERY, DISTRIBUTION_QUERY, MOST_IMPROVED_QUERY, STUDENT_RESULTS_QUERY,
+                       ResultStore)
 
 DB_HOST = os.getenv("DB_HOST")
 DB_NAME = os.getenv("DB_NAME")
 DB_USER = os.getenv("DB_USER")
 DB_PASSWORD = os.getenv("DB_PASSWORD")
 DB_PORT = os.getenv("DB_PORT")
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "5"))
+
+# Shared connection pool (opened on first use) and a cache for repeat student lookups
+db_pool = DatabasePool(
+    size=DB_POOL_SIZE,
+    host=DB_HOST,
+    database=DB_NAME,
+    user=DB_USER,
+    password=DB_PASSWORD,
+    port=DB_PORT
+)
+student_cache = TTLCache(
+    maxsize=int(os.getenv("STUDENT_CACHE_SIZE", "1024")),
+    ttl=float(os.getenv("STUDENT_CACHE_TTL", "300")),
+)
 
-# Initialize FastAPI app
-app = FastAPI()
+STUDENT_DETAILS_QUERY = """
+    SELECT
+        u.id as stud_id, 
+        u.first_name || ' ' || u.last_name AS full_name,
+        c.name as college_name,
+        d.name as department_name
+    FROM 
+        public.user u, public.college c, public.department d
+    where 
+        u.college_id = c.id  and u.college_id = d.id  and u.id = $1
+"""
 
-def get_db_connection():
-    """Establishes a secure database connection."""
-    try:
-        conn = psycopg2.connect(
-            host=DB_HOST,
-            database=DB_NAME,
-            user=DB_USER,
-            password=DB_PASSWORD,
-            port=DB_PORT
-        )
-        return conn
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Database connection failed: {str(e)}")
+STUDENTS_DETAILS_QUERY = STUDENT_DETAILS_QUERY.replace("u.id = $1", "u.id = ANY($1)")
+
+# Every new analysis is stored in Postgres, with per-college/department aggregates for the analytics endpoints
+result_store = ResultStore(db_pool)
 
 @app.get("/test-db")
 def test_db_connection():
     """API endpoint to test database connectivity."""
     try:
-        conn = get_db_connection()
-        cur = conn.cursor()
-        cur.execute("SELECT NOW();")
-        current_time = cur.fetchone()
-        cur.close()
-        conn.close()
+        current_time = db_pool.fetch_one("SELECT NOW();")
         return {"message": "✅ Database connected successfully!", "current_time": current_time}
-    except HTTPException as e:
-        return {"error": str(e)}
+    except psycopg2.Error as e:
+        return {"error": f"Database connection failed: {str(e)}"}
 
 @app.get("/get-student/{student_id}")
 def get_student_details(student_id: str):
     """API endpoint to fetch student details based on student ID."""
+    candidate_details = student_cache.get(student_id)
+    if candidate_details is not None:
+        return candidate_details
     try:
-        conn = get_db_connection()
-        query = """
-        SELECT
-            u.id as stud_id, 
-            u.first_name || ' ' || u.last_name AS full_name,
-            c.name as college_name,
-            d.name as department_name
-        FROM 
-            public.user u, public.college c, public.department d
-        where 
-            u.college_id = c.id  and u.college_id = d.id  and u.id = %s
-
-        """
-        df = pd.read_sql(query, conn, params=(student_id,))
-        conn.close()
-
-        if df.empty:
-            raise HTTPException(status_code=404, detail="Student not found")
-
-        return df.to_dict(orient="records")[0]  # Return the first record
-
+        with span("db_lookup"):
+            rows = db_pool.fetch_prepared("student_details", STUDENT_DETAILS_QUERY, (student_id,))
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error retrieving student details: {str(e)}")
 
+    if not rows:
+        raise HTTPException(status_code=404, detail="Student not found")
+
+    candidate_details = rows[0]  # Return the first record
+    student_cache.set(student_id, candidate_details)
+    return candidate_details
+
+def get_students_details(student_ids: List[str]) -> dict:
+    """Fetches many students with a single query and returns them keyed by student ID."""
+    details = {}
+    missing = []
+    for student_id in dict.fromkeys(student_ids):
+        cached = student_cache.get(student_id)
+        if cached is not None:
+            details[student_id] = cached
+        else:
+            missing.append(student_id)
+
+    if missing:
+        # Passed as an untyped array literal so Postgres coerces it to the type of u.id
+        array_literal = "{" + ",".join('"' + sid.replace("\\", "\\\\").replace('"', '\\"') + '"' for sid in missing) + "}"
+        try:
+            with span("db_lookup", students=len(missing)):
+                rows = db_pool.fetch_prepared("students_details", STUDENTS_DETAILS_QUERY, (array_literal,))
+        except Exception as e:
+            raise HTTPException(status_code=500, detail=f"Error retrieving student details: {str(e)}")
+        for row in rows:
+            student_id = str(row["stud_id"])
+            if student_id not in details:
+                details[student_id] = row
+                student_cache.set(student_id, row)
+    return details
+
 @app.post("/upload-audio/")
-def upload_audio(audio: UploadFile = File(...)):
-    """Endpoint to upload an audio file."""
-    file_path, filename = save_audio_file(audio)
-    upload_to_s3(file_path, filename)
-    job_name = filename + ".txt"
-    return {"message": "Audio uploaded successfully. Transcription in progress.", "job_name": job_name}
+async def upload_audio(audio: UploadFile = File(...), stud_id: Optional[str] = None, question: Optional[str] = None,
+                       stream_tts: bool = False, mode: str = "transcribe"):
+    """Endpoint to upload an audio file. Returns a job ID right away; the pipeline runs in the background.
 
-import asyncio
+    `mode` is "transcribe" (S3 + AWS Transcribe), "direct" (audio sent straight to the
+    model in one call) or "auto" (direct for recordings up to DIRECT_AUDIO_MAX_SECONDS).
+    """
+    if mode not in ("transcribe", "direct", "auto"):
+        raise HTTPException(status_code=422, detail="mode must be 'transcribe', 'direct' or 'auto'")
+    # Too-large recordings are turned away before anything loads or decodes them
+    if audio.size is not None and audio.size > AUDIO_MAX_MB * 1024 * 1024:
+        raise HTTPException(status_code=413, detail=f"Recording is larger than {AUDIO_MAX_MB} MB.")
+    check_duration(await asyncio.to_thread(wav_duration, audio.file), AUDIO_MAX_SECONDS)
+    # The upload is already spooled to disk by the time we get here; hashing reads it back once.
+    # The hash decides whether anything is uploaded at all, so it can't come from the upload itself.
+    with span("upload_hash"):
+        sha256 = await asyncio.to_thread(hash_file, audio.file)
+    params = {"stud_id": stud_id, "question": question, "sha256": sha256, "stream_tts": stream_tts}
+
+    if mode != "transcribe" and stud_id and question:
+        data = await audio.read()
+        with span("audio_compress"):
+            compressed, mime_type, duration = await asyncio.to_thread(
+                compress_for_model, data, audio.content_type or "audio/wav", max_seconds=AUDIO_MAX_SECONDS
+            )
+        if mode == "direct" or (duration is not None and duration <= DIRECT_AUDIO_MAX_SECONDS):
+            job = await job_manager.submit(
+                direct_stages(compressed, mime_type, sha256, stud_id, question, stream_tts),
+                params={"mode": "direct", **params},
+            )
+            return {"message": "Audio received. Analysis in progress.", "job_id": job.id}
+        await audio.seek(0)
+    elif mode == "direct":
+        raise HTTPException(status_code=422, detail="Direct mode needs stud_id and question.")
+
+    # Retried submissions of the same recording reuse the earlier upload, transcript and job
+    params["mode"] = "transcribe"
+    local_audio = None
+    retry = False
+    existing = upload_index.get(sha256)
+    # The local backend needs the audio again unless the transcript is already cached
+    if existing and TRANSCRIPTION_BACKEND == "local" and existing["transcript"] is None:
+        existing = None
+    if existing:
+        job_name = existing["job_name"]
+        previous = await job_manager.find(existing["job_id"] or "")
+        if previous and previous["status"] != "failed" and all(previous["params"].get(k) == v for k, v in params.items()):
+            return {"message": "Audio already uploaded.", "job_name": job_name, "job_id": previous["job_id"]}
+        # A job Transcribe reported FAILED or unknown stays that way under its name; upload again under a
+        # new one. Other failures (a wait timeout, a transcript download error) reuse the running job.
+        transcribe_gone = previous and \
+            previous["stages"].get("transcribe", {}).get("error_code") == TranscriptionJobGone.error_code
+        if existing["transcript"] is None and (transcribe_gone or previous is None):
+            upload_index.remove(sha256)
+            existing = None
+            retry = True
+    if not existing:
+        if AUDIO_PREPROCESS:
+            # Mono 16 kHz, silence trimmed and compressed: less to upload and less billed Transcribe time
+            data = await audio.read()
+            with span("audio_preprocess"):
+                processed = await asyncio.to_thread(
+                    preprocess_audio, data, audio.content_type or "audio/wav", AUDIO_FORMAT,
+                    max_seconds=AUDIO_MAX_SECONDS, silence_thresh=AUDIO_SILENCE_THRESH_DB,
+                )
+            filename = audio_filename(sha256, processed.extension, retry)
+            body = processed.data
+        else:
+            filename = audio_filename(sha256, retry=retry)
+            body = audio
+        job_name = filename + ".txt"
+
+        if TRANSCRIPTION_BACKEND == "local":
+            # Transcribed on this node, nothing goes to S3
+            local_audio = body if isinstance(body, bytes) else await body.read()
+            upload_index.add(sha256, "", job_name)
+        else:
+            await upload_to_s3(body, filename)
+            upload_index.add(sha256, filename, job_name)
+
+    job = await job_manager.submit(
+        interview_stages(job_name, stud_id, question, stream_tts, audio=local_audio),
+        params={"job_name": job_name, **params},
+    )
+    upload_index.set_job_id(sha256, job.id)
+    if existing:
+        message = "Audio already uploaded. Reusing the earlier upload and transcript."
+    else:
+        message = "Audio uploaded successfully. Transcription in progress."
+    return {"message": message, "job_name": job_name, "job_id": job.id}
+
+def store_analysis(job, analysis: InterviewAnalysis):
+    """Copies an analysis into a job's result."""
+    job.result["ratings"] = analysis.ratings.model_dump()
+    job.result["feedback"] = analysis.feedback.model_dump()
+    job.result["candidate_response"] = analysis.candidate_response
+
+async def speak(job):
+    """Pipeline stage: renders the candidate response to speech."""
+    job.result["audio_url"] = await asyncio.to_thread(text_to_speech, job.result["candidate_response"])
+
+def direct_stages(audio_bytes: bytes, mime_type: str, sha256: str, stud_id: str, question: str, stream_tts: bool = False):
+    """Builds the single-hop analyze -> TTS stages, where the model also transcribes the audio."""
+    async def analyze(job):
+        analysis = await analyze_audio(audio_bytes, mime_type, sha256, stud_id, question)
+        job.result["transcript"] = analysis.transcript
+        store_analysis(job, analysis)
+
+    stages = [("analyze", analyze)]
+    if not stream_tts:
+        stages.append(("tts", speak))
+    return stages
+
+def interview_stages(job_name: str, stud_id: Optional[str], question: Optional[str], stream_tts: bool = False,
+                     audio: Optional[bytes] = None):
+    """Builds the transcribe -> analyze -> TTS stages for an uploaded recording."""
+    async def transcribe(job):
+        job.result["transcript"] = await get_transcription_result(job_name, audio)
+
+    async def analyze(job):
+        analysis = await analyze_transcript(job.result["transcript"], stud_id, question)
+        store_analysis(job, analysis)
+
+    stages = [("transcribe", transcribe)]
+    # Analysis needs a student and a question; without them the job stops at the transcript
+    if stud_id and question:
+        stages.append(("analyze", analyze))
+        # Streaming clients pull audio from /jobs/{id}/speech instead of a pre-rendered file
+        if not stream_tts:
+            stages.append(("tts", speak))
+    return stages
+
+@app.get("/jobs/{job_id}")
+async def get_job(job_id: str):
+    """Returns per-stage status and results for a pipeline job."""
+    return await job_manager.get(job_id)
+
+@app.get("/jobs/{job_id}/events")
+async def job_events(job_id: str):
+    """Streams job status updates as server-sent events until the job finishes."""
+    await job_manager.get(job_id)
+
+    async def event_stream():
+        async for state in job_manager.watch(job_id):
+            yield f"data: {json.dumps(state)}\n\n"
+
+    return StreamingResponse(event_stream(), media_type="text/event-stream")
+
+@app.get("/jobs/{job_id}/speech")
+async def job_speech(job_id: str, lang: str = "en", voice: str = "com"):
+    """Streams the candidate response audio sentence by sentence as soon as the analysis is ready."""
+    await job_manager.get(job_id)
+    async for job in job_manager.watch(job_id):
+        if "candidate_response" in job["result"]:
+            break
+    else:
+        raise HTTPException(status_code=409, detail=job["error"] or "Job has no candidate response.")
+
+    return StreamingResponse(
+        stream_speech(speech_renderer, job["result"]["candidate_response"], lang=lang, voice=voice, workers=TTS_STREAM_WORKERS),
+        media_type="audio/mpeg",
+    )
+
+async def stored(key: str, stud_id: str, question: str, analysis) -> dict:
+    """Awaits a fresh analysis and records it for analytics; cache hits were recorded when first computed."""
+    result = await analysis
+    with span("result_store"):
+        await asyncio.to_thread(result_store.record, key, stud_id, question, result)
+    return result
+
+async def analyze_transcript(transcript: str, stud_id: str, question: str) -> InterviewAnalysis:
+    """Returns the structured analysis of a transcript, from the result cache when possible."""
+    candidate_details = await asyncio.to_thread(get_student_details, stud_id)
+    logger.debug(f"trace={trace_id_var.get()} candidate={candidate_details}")
+    key = analysis_key(transcript, candidate_details, question, MODEL_ID, PROMPT_VERSION)
+    result = await analysis_cache.get_or_compute(
+        key, lambda: stored(key, stud_id, question, run_analysis(transcript, candidate_details, question)), stud_id=stud_id
+    )
+    with span("json_validation"):
+        return InterviewAnalysis.model_validate(result)
+
+async def run_analysis(transcript: str, candidate_details: dict, question: str) -> dict:
+    """Runs the model on a transcript and returns the structured analysis."""
+    prompt = transcript_prompt(transcript, candidate_details, question)
+    try:
+        with span("model_call") as call:
+            response = await model_limiter.run(lambda: create_agent().arun(prompt))
+            call.update(record_tokens(response, MODEL_ID))
+
+        logger.info(f"trace={trace_id_var.get()} analysis tokens: {call}")
+        return complete_analysis(response.content, transcript).model_dump()
+
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Error during processing: {e}")
+        raise HTTPException(status_code=500, detail="Error generating interview analysis.")
+
+async def analyze_audio(audio_bytes: bytes, mime_type: str, sha256: str, stud_id: str, question: str) -> InterviewAnalysis:
+    """Single-hop analysis: the model transcribes and evaluates the recording in one call."""
+    candidate_details = await asyncio.to_thread(get_student_details, stud_id)
+    key = analysis_key(f"audio:{sha256}", candidate_details, question, MODEL_ID, PROMPT_VERSION)
+    result = await analysis_cache.get_or_compute(
+        key, lambda: stored(key, stud_id, question, run_audio_analysis(audio_bytes, mime_type, candidate_details, question)),
+        stud_id=stud_id,
+    )
+    with span("json_validation"):
+        return InterviewAnalysis.model_validate(result)
+
+async def run_audio_analysis(audio_bytes: bytes, mime_type: str, candidate_details: dict, question: str) -> dict:
+    """Sends the recording inline with the prompt and returns the structured analysis."""
+    from agno.media import Audio
+
+    prompt = audio_prompt(candidate_details, question)
+    audio = Audio(content=audio_bytes, mime_type=mime_type)
+    try:
+        with span("model_call", audio_bytes=len(audio_bytes)) as call:
+            response = await model_limiter.run(lambda: create_agent(AudioModelAnalysis).arun(prompt, audio=[audio]))
+            call.update(record_tokens(response, MODEL_ID))
+
+        logger.info(f"trace={trace_id_var.get()} audio analysis tokens: {call}")
+        return complete_analysis(response.content, response.content.transcript).model_dump()
+
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Error during processing: {e}")
+        raise HTTPException(status_code=500, detail="Error generating interview analysis.")
+
+async def analyze_pack(entries: List[dict]) -> dict:
+    """Analyzes several transcripts in one model call, falling back to one call per transcript."""
+    analyses = {}
+    if len(entries) > 1:
+        try:
+            with span("model_call", transcripts=len(entries)) as call:
+                response = await model_limiter.run(lambda: create_agent(BatchAnalysis).arun(batch_prompt(entries)))
+                call.update(record_tokens(response, MODEL_ID))
+            transcripts = {entry["item_id"]: entry["transcript"] for entry in entries}
+            for item in response.content.analyses:
+                if item.item_id in transcripts:
+                    analyses[item.item_id] = complete_analysis(item, transcripts[item.item_id])
+        except Exception as e:
+            logger.warning(f"Packed analysis of {len(entries)} transcripts failed, analyzing one by one: {e}")
+
+    async def analyze_one(entry):
+        try:
+            analyses[entry["item_id"]] = await analyze_transcript(entry["transcript"], entry["stud_id"], entry["question"])
+        except Exception as e:
+            analyses[entry["item_id"]] = e
+
+    await asyncio.gather(*(analyze_one(entry) for entry in entries if entry["item_id"] not in analyses))
+    return analyses
+
+async def analyze_batch(items: List[BatchItem]) -> List[dict]:
+    """Analyzes a cohort: bulk transcript/student lookup, then packed model calls through the limiter."""
+    transcripts = await asyncio.gather(
+        *(get_transcription_result(item.job_name) for item in items), return_exceptions=True
+    )
+    students = await asyncio.to_thread(get_students_details, [item.stud_id for item in items])
+
+    results = [{"job_name": item.job_name, "stud_id": item.stud_id, "question": item.question} for item in items]
+    entries = []
+    for index, (item, transcript) in enumerate(zip(items, transcripts)):
+        if isinstance(transcript, Exception):
+            results[index].update(status="failed", error=getattr(transcript, "detail", str(transcript)))
+        elif item.stud_id not in students:
+            results[index].update(status="failed", error="Student not found")
+        else:
+            key = analysis_key(transcript, students[item.stud_id], item.question, MODEL_ID, PROMPT_VERSION)
+            cached = analysis_cache.get(key)
+            if cached is not None:
+                results[index].update(status="completed", **cached)
+                continue
+            entries.append({
+                "item_id": str(index),
+                "key": key,
+                "stud_id": item.stud_id,
+                "question": item.question,
+                "transcript": transcript,
+                "candidate_details": students[item.stud_id],
+            })
+
+    entries_by_id = {entry["item_id"]: entry for entry in entries}
+    packs = [entries[i:i + BATCH_PACK_SIZE] for i in range(0, len(entries), BATCH_PACK_SIZE)]
+    new_results = []
+    for analyses in await asyncio.gather(*(analyze_pack(pack) for pack in packs)):
+        for item_id, analysis in analyses.items():
+            result = results[int(item_id)]
+            if isinstance(analysis, Exception):
+                result.update(status="failed", error=getattr(analysis, "detail", str(analysis)))
+            else:
+                result.update(status="completed", **analysis.model_dump())
+                analysis_cache.set(entries_by_id[item_id]["key"], analysis.model_dump(), stud_id=result["stud_id"])
+                new_results.append((entries_by_id[item_id]["key"], result["stud_id"], result["question"], analysis.model_dump()))
+
+    # Already-stored keys (e.g. items that fell back to single analysis) are skipped by the store
+    with span("result_store", results=len(new_results)):
+        await asyncio.to_thread(lambda: [result_store.record(*args) for args in new_results])
+    return results
+
+@app.post("/analyze-batch/")
+async def analyze_batch_endpoint(items: List[BatchItem]):
+    """Queues a cohort of interviews for analysis. Poll GET /jobs/{job_id} for per-item results."""
+    async def run(job):
+        job.result["items"] = await analyze_batch(items)
+
+    job = await job_manager.submit([("analyze_batch", run)], params={"items": len(items)})
+    return {"message": f"Batch of {len(items)} interviews queued.", "job_id": job.id}
+
+@app.websocket("/live-interview")
+async def live_interview(websocket: WebSocket, stud_id: str, question: str, sample_rate: int = 16000):
+    """Transcribes a recording while the candidate is still speaking.
+
+    The client sends 16-bit mono PCM chunks as binary frames and {"event": "stop"} when
+    done. The server replies with {"event": "partial", "transcript": ...} as windows are
+    transcribed and finally {"event": "final", ...} with the analysis.
+    """
+    # Browsers can't set headers on WebSockets, so the trace ID may also come as a query parameter
+    with trace(websocket.headers.get("x-trace-id") or websocket.query_params.get("trace_id")):
+        await websocket.accept()
+        if not hasattr(transcription_backend, "transcribe_samples"):
+            await websocket.send_json({"event": "error", "detail": "Live transcription needs TRANSCRIPTION_BACKEND=local."})
+            await websocket.close(code=1011)
+            return
+
+        from live import LiveTranscript
+        live = LiveTranscript(transcription_backend, sample_rate=sample_rate, window_seconds=LIVE_WINDOW_SECONDS)
+
+        async def push_partials():
+            async for transcript in live.updates():
+                await websocket.send_json({"event": "partial", "transcript": transcript})
+
+        pusher = asyncio.ensure_future(push_partials())
+        try:
+            while True:
+                message = await websocket.receive()
+                if message["type"] == "websocket.disconnect":
+                    return
+                if message.get("bytes"):
+                    live.feed(message["bytes"])
+                elif message.get("text") and json.loads(message["text"]).get("event") == "stop":
+                    break
+
+            # Only the last partial window and the model evaluation are left once the candidate stops
+            live.finish()
+            await pusher
+            analysis = await analyze_transcript(live.transcript, stud_id, question)
+            audio_url = await asyncio.to_thread(text_to_speech, analysis.candidate_response)
+            await websocket.send_json({"event": "final", **analysis.model_dump(), "transcript": live.transcript, "audio_url": audio_url})
+            await websocket.close()
+        except WebSocketDisconnect:
+            pass
+        except HTTPException as e:
+            await websocket.send_json({"event": "error", "detail": e.detail})
+            await websocket.close(code=1011)
+        finally:
+            pusher.cancel()
+            live.cancel()
+
+@app.get("/analysis-cache/stats")
+def analysis_cache_stats():
+    """Hit/miss counters for the analysis result cache (of the worker process answering)."""
+    stats = dict(analysis_cache.stats)
+    lookups = stats["memory_hits"] + stats["persistent_hits"] + stats["misses"]
+    stats["hit_rate"] = (stats["memory_hits"] + stats["persistent_hits"]) / lookups if lookups else 0.0
+    return stats
+
+@app.delete("/analysis-cache")
+def invalidate_analysis_cache(key: Optional[str] = None, stud_id: Optional[str] = None):
+    """Drops cached analyses: one key, all of a student's, or everything."""
+    return {"message": "Analysis cache invalidated.", "removed": analysis_cache.invalidate(key=key, stud_id=stud_id)}
+
+# Sampled at scrape time
+REGISTRY.gauge("interview_jobs_queued", "Pipeline jobs waiting for a worker.", lambda: job_manager.queue_depth)
+REGISTRY.gauge("interview_jobs_in_flight", "Pipeline jobs being run.", lambda: job_manager.in_flight)
+REGISTRY.gauge("interview_job_workers", "Configured pipeline workers.", lambda: JOB_WORKERS)
+REGISTRY.gauge("interview_model_calls_waiting", "Model calls queued in the limiter.", lambda: model_limiter.waiting)
+REGISTRY.gauge("interview_model_calls_running", "Model calls in progress.", lambda: model_limiter.running)
+REGISTRY.gauge("interview_transcriptions_pending", "Transcribe jobs being polled.", lambda: transcription_waiter.pending)
+for _name in ("memory_hits", "persistent_hits", "misses", "shared"):
+    REGISTRY.gauge(f"interview_analysis_cache_{_name}", f"Analysis cache {_name.replace('_', ' ')} since start.",
+                   lambda _name=_name: analysis_cache.stats[_name])
+
+@app.get("/metrics", response_class=PlainTextResponse)
+def metrics():
+    """Prometheus metrics: per-stage latency histograms, queue depths and model token usage (this worker only)."""
+    return PlainTextResponse(REGISTRY.render(), media_type="text/plain; version=0.0.4")
+
+def analytics_rows(name: str, sql: str, params: tuple = ()) -> list:
+    """Runs one of the analytics queries against the aggregate tables."""
+    try:
+        return result_store.fetch(name, sql, params)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error retrieving analytics: {str(e)}")
+
+@app.get("/analytics/colleges")
+def college_averages():
+    """Average scores per college, best first."""
+    return analytics_rows("college_averages", COLLEGE_AVERAGES_QUERY)
+
+@app.get("/analytics/colleges/{college_id}/departments")
+def department_averages(college_id: str):
+    """Average scores per department of one college."""
+    return analytics_rows("department_averages", DEPARTMENT_AVERAGES_QUERY, (college_id,))
+
+@app.get("/analytics/distribution")
+def score_distribution(college_id: Optional[str] = None):
+    """Number of interviews per whole-point overall rating (0-10), overall or for one college."""
+    if college_id is None:
+        rows = analytics_rows("score_distribution", DISTRIBUTION_QUERY)
+    else:
+        rows = analytics_rows("college_score_distribution", COLLEGE_DISTRIBUTION_QUERY, (college_id,))
+    counts = {row["bucket"]: row["interviews"] for row in rows}
+    return [{"bucket": bucket, "interviews": counts.get(bucket, 0)} for bucket in range(11)]
+
+@app.get("/analytics/most-improved")
+def most_improved(college_id: Optional[str] = None, limit: int = 20):
+    """Students whose latest overall rating improved most on their first one."""
+    limit = max(1, min(limit, 500))
+    if college_id is None:
+        return analytics_rows("most_improved", MOST_IMPROVED_QUERY, (limit,))
+    return analytics_rows("college_most_improved", COLLEGE_MOST_IMPROVED_QUERY, (limit, college_id))
+
+@app.get("/analytics/students/{student_id}/results")
+def student_results(student_id: str, limit: int = 50):
+    """A student's stored results, newest first."""
+    return analytics_rows("student_results", STUDENT_RESULTS_QUERY, (student_id, max(1, min(limit, 500))))
 
 @app.post("/analyze-interview/")
 async def analyze_interview(job_name: str, stud_id: str, question: str):
     """Processes the transcribed interview and returns feedback."""
-    transcript = get_transcription_result(job_name)
-    candidate_details = get_student_details(stud_id)
-    print(candidate_details)
-    prompt = f"""
-    You are an AI mock interview coach designed to evaluate the candidate's response using
-    **Candidate Details:**
-    - Name: {candidate_details['full_name']}
-    - College: {candidate_details['college_name']}
-    - Branch: {candidate_details['department_name']}
-    and the **transcript**:
-    "{transcript}"
-    
-    Evaluate based on clarity, structure, confidence, relevance, and communication.
-    remember use the name , college, branch details from the candidate details becatue the transcript some ime do not give correct results
-    ### **Your Response Format (JSON Output):**
-    {{
-        "transcript": "Generated transcript of the candidate’s response",
-        "ratings": {{
-            "clarity": "Score out of 10",
-            "structure": "Score out of 10",
-            "confidence": "Score out of 10",
-            "relevance": "Score out of 10",
-            "communication": "Score out of 10",
-            "overall_rating": "Average of all scores"
-        }},
-        "feedback": {{
-            "strengths": "Highlight strong points in the candidate’s response.",
-            "improvements": "Identify areas for improvement.",
-            "suggestions": "Provide actionable advice for better responses."
-        }},
-        "candidate_response": "Assume you are a candidate attending a job interview and answer the question {question} use the content given by the user as an input context to agent"
-    }}
-    """
-    
+    transcript = await get_transcription_result(job_name)
+    analysis = await analyze_transcript(transcript, stud_id, question)
     try:
-        # No need for `await` if `agent.run(prompt)` is synchronous
-        response = agent.run(prompt)  
-
-        logger.info(f"AI Response: {response}")  
-        return response.content.ratings, response.content.feedback, text_to_speech(str(response.content.candidate_response)),response.content.candidate_response
-    
+        audio_url = await asyncio.to_thread(text_to_speech, str(analysis.candidate_response))
+        return analysis.ratings, analysis.feedback, audio_url, analysis.candidate_response
     except Exception as e:
         logger.error(f"Error during processing: {e}")
         raise HTTPException(status_code=500, detail="Error generating interview analysis.")
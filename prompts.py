@@ -0,0 +1,112 @@
+from typing import List
+
+from pydantic import BaseModel, Field
+
+# Bump whenever a prompt or model schema changes so cached analyses from the old one are not reused
+PROMPT_VERSION = "2"
+
+SCORE = "Score from 0 to 10"
+
+
+class RatingScores(BaseModel):
+    """The five scores the model gives; overall_rating is derived from them on our side."""
+    clarity: float = Field(description=SCORE)
+    structure: float = Field(description=SCORE)
+    confidence: float = Field(description=SCORE)
+    relevance: float = Field(description=SCORE)
+    communication: float = Field(description=SCORE)
+
+
+class Ratings(RatingScores):
+    overall_rating: float
+
+
+class Feedback(BaseModel):
+    strengths: str
+    improvements: str
+    suggestions: str
+
+
+class InterviewAnalysis(BaseModel):
+    """What the API returns and caches for one interview."""
+    transcript: str
+    ratings: Ratings
+    feedback: Feedback
+    candidate_response: str
+
+
+# Model output schemas, supplied through structured outputs only. They leave out
+# everything we already have or can compute, so the model doesn't spend tokens on it.
+class ModelAnalysis(BaseModel):
+    ratings: RatingScores
+    feedback: Feedback
+    candidate_response: str = Field(description="The candidate's answer, rewritten as a strong first-person reply")
+
+
+class AudioModelAnalysis(ModelAnalysis):
+    # Direct audio mode has no other transcript, so this one is still generated
+    transcript: str = Field(description="Word-for-word transcript of the recording")
+
+
+class BatchItemAnalysis(ModelAnalysis):
+    item_id: str
+
+
+class BatchAnalysis(BaseModel):
+    analyses: List[BatchItemAnalysis]
+
+
+RUBRIC = """Rate clarity, structure, confidence, relevance to the question and communication.
+Feedback must be specific to this answer. The transcript is machine-generated and may garble
+names; the candidate details are correct. For candidate_response, answer the question as this
+candidate at their best, using what they said as context."""
+
+
+def candidate_line(candidate_details: dict) -> str:
+    return (f"{candidate_details['full_name']}, {candidate_details['department_name']}, "
+            f"{candidate_details['college_name']}")
+
+
+def transcript_prompt(transcript: str, candidate_details: dict, question: str) -> str:
+    """Prompt for evaluating one transcribed answer."""
+    return f"""You are a mock interview coach. {RUBRIC}
+
+Candidate: {candidate_line(candidate_details)}
+Question: {question}
+Transcript: "{transcript}\""""
+
+
+def audio_prompt(candidate_details: dict, question: str) -> str:
+    """Prompt for transcribing and evaluating an attached recording in one call."""
+    return f"""You are a mock interview coach. Transcribe the attached answer word for word, then evaluate it.
+{RUBRIC}
+
+Candidate: {candidate_line(candidate_details)}
+Question: {question}"""
+
+
+def batch_prompt(entries: List[dict]) -> str:
+    """Prompt evaluating several transcripts at once, sharing the rubric between them."""
+    candidates = "\n\n".join(
+        f"""item_id: {entry['item_id']}
+Candidate: {candidate_line(entry['candidate_details'])}
+Question: {entry['question']}
+Transcript: "{entry['transcript']}\""""
+        for entry in entries
+    )
+    return f"""You are a mock interview coach. Evaluate each answer independently and return one
+analysis per item_id. {RUBRIC}
+
+{candidates}"""
+
+
+def complete_analysis(output: ModelAnalysis, transcript: str) -> InterviewAnalysis:
+    """Turns the model's output into the full analysis: transcript attached, overall rating computed."""
+    scores = {name: min(max(value, 0.0), 10.0) for name, value in output.ratings.model_dump().items()}
+    overall_rating = round(sum(scores.values()) / len(scores), 1)
+    return InterviewAnalysis(
+        transcript=transcript,
+        ratings=Ratings(**scores, overall_rating=overall_rating),
+        feedback=output.feedback,
+        candidate_response=output.candidate_response,
+    )
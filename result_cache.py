@@ -0,0 +1,134 @@
+import asyncio
+import hashlib
+import json
+import time
+from typing import Awaitable, Callable, Dict, Optional
+
+from db import SqliteDatabase, TTLCache
+
+
+def normalize_text(text: str) -> str:
+    """Collapses whitespace and case so trivially different inputs share a cache entry."""
+    return " ".join(str(text).split()).casefold()
+
+
+def analysis_key(transcript: str, candidate_details: dict, question: str, model_id: str, prompt_version: str) -> str:
+    """Cache key for one analysis: transcript, candidate, question and the model/prompt that produced it."""
+    payload = {
+        "transcript": normalize_text(transcript),
+        "candidate": {k: normalize_text(v) for k, v in candidate_details.items()},
+        "question": normalize_text(question),
+        "model": model_id,
+        "prompt": prompt_version,
+    }
+    return hashlib.sha256(json.dumps(payload, sort_keys=True).encode("utf-8")).hexdigest()
+
+
+class ResultCache:
+    """Two-tier cache for analysis results: an in-process LRU in front of SQLite.
+
+    Concurrent requests for the same key share one computation, so a double-clicked
+    Submit only costs one model call. Entries expire after `ttl` seconds in both
+    tiers and can be dropped explicitly per key or per student.
+
+    Invalidation bumps a generation number in SQLite. Every worker process checks it
+    before a memory hit, so entries dropped through one worker aren't served from
+    another's memory.
+    """
+
+    def __init__(self, path: str, maxsize: int = 1024, ttl: float = 7 * 24 * 3600):
+        self.ttl = ttl
+        self._memory = TTLCache(maxsize=maxsize, ttl=ttl)
+        self._inflight: Dict[str, asyncio.Future] = {}
+        self._db = SqliteDatabase(path)
+        self._db.execute(
+            """
+            CREATE TABLE IF NOT EXISTS analyses (
+                key TEXT PRIMARY KEY,
+                stud_id TEXT,
+                result TEXT NOT NULL,
+                expires_at REAL NOT NULL
+            )
+            """
+        )
+        self._db.execute("CREATE INDEX IF NOT EXISTS analyses_stud_id ON analyses (stud_id)")
+        self._db.execute("CREATE TABLE IF NOT EXISTS generation (id INTEGER PRIMARY KEY CHECK (id = 0), value INTEGER)")
+        self._db.execute("INSERT OR IGNORE INTO generation (id, value) VALUES (0, 0)")
+        self._generation = self._current_generation()
+        self.stats = {"memory_hits": 0, "persistent_hits": 0, "misses": 0, "shared": 0}
+
+    def _current_generation(self) -> int:
+        return self._db.fetch_one("SELECT value FROM generation WHERE id = 0")[0]
+
+    def _sync_memory(self):
+        generation = self._current_generation()
+        if generation != self._generation:
+            # Another worker invalidated entries; which ones doesn't matter for a small LRU
+            self._memory.invalidate()
+            self._generation = generation
+
+    def get(self, key: str) -> Optional[dict]:
+        self._sync_memory()
+        result = self._memory.get(key)
+        if result is not None:
+            self.stats["memory_hits"] += 1
+            return result
+        row = self._db.fetch_one("SELECT result FROM analyses WHERE key = ? AND expires_at > ?", (key, time.time()))
+        if row is None:
+            self.stats["misses"] += 1
+            return None
+        self.stats["persistent_hits"] += 1
+        result = json.loads(row[0])
+        self._memory.set(key, result)
+        return result
+
+    def set(self, key: str, result: dict, stud_id: Optional[str] = None):
+        self._memory.set(key, result)
+        self._db.execute(
+            "INSERT OR REPLACE INTO analyses (key, stud_id, result, expires_at) VALUES (?, ?, ?, ?)",
+            (key, stud_id, json.dumps(result), time.time() + self.ttl),
+        )
+
+    async def get_or_compute(self, key: str, compute: Callable[[], Awaitable[dict]],
+                             stud_id: Optional[str] = None) -> dict:
+        """Returns the cached result, joins an identical in-flight computation, or computes it."""
+        result = self.get(key)
+        if result is not None:
+            return result
+        if key in self._inflight:
+            self.stats["shared"] += 1
+            return await asyncio.shield(self._inflight[key])
+
+        future = asyncio.get_running_loop().create_future()
+        self._inflight[key] = future
+        try:
+            result = await compute()
+            self.set(key, result, stud_id)
+            future.set_result(result)
+            return result
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except Exception as e:
+            future.set_exception(e)
+            # Nobody else may be waiting; don't let asyncio warn about an unretrieved exception
+            future.exception()
+            raise
+        finally:
+            del self._inflight[key]
+
+    def invalidate(self, key: Optional[str] = None, stud_id: Optional[str] = None) -> int:
+        """Drops one key, every entry for a student, or (with no arguments) everything."""
+        if key is not None:
+            removed = self._db.execute("DELETE FROM analyses WHERE key = ?", (key,))
+        elif stud_id is not None:
+            removed = self._db.execute("DELETE FROM analyses WHERE stud_id = ?", (stud_id,))
+        else:
+            removed = self._db.execute("DELETE FROM analyses")
+        self._db.execute("UPDATE generation SET value = value + 1 WHERE id = 0")
+        if key is not None:
+            self._memory.invalidate(key)
+        else:
+            # The LRU doesn't know which student a key belongs to, so clear it
+            self._memory.invalidate()
+        return removed
@@ -0,0 +1,34 @@
+import threading
+from typing import Callable, Generic, TypeVar
+
+T = TypeVar("T")
+
+
+class LazyService(Generic[T]):
+    """Creates a client on first use and then stands in for it.
+
+    Attribute access is forwarded to the real object, so module-level clients can
+    be declared as before without paying for them at import time. Creation is
+    guarded by a lock, so concurrent first uses build a single instance. Each
+    process builds its own instance, which keeps boto3 / gRPC clients from being
+    shared across forked workers.
+    """
+
+    def __init__(self, factory: Callable[[], T]):
+        self._factory = factory
+        self._instance = None
+        self._lock = threading.Lock()
+
+    @property
+    def ready(self) -> bool:
+        return self._instance is not None
+
+    def get(self) -> T:
+        if self._instance is None:
+            with self._lock:
+                if self._instance is None:
+                    self._instance = self._factory()
+        return self._instance
+
+    def __getattr__(self, name):
+        return getattr(self.get(), name)
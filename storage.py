@@ -0,0 +1,84 @@
+import asyncio
+import base64
+import hashlib
+from typing import Awaitable, Callable
+
+from agno.utils.log import logger
+
+# S3 rejects multipart parts smaller than 5 MiB (except the last one)
+MIN_PART_SIZE = 5 * 1024 * 1024
+
+
+def checksum(body: bytes) -> str:
+    """Base64 SHA-256, the form S3 expects in ChecksumSHA256."""
+    return base64.b64encode(hashlib.sha256(body).digest()).decode("ascii")
+
+
+async def stream_to_s3(s3_client, bucket: str, key: str, read: Callable[[int], Awaitable[bytes]],
+                       part_size: int = 8 * 1024 * 1024, parallelism: int = 4) -> dict:
+    """Streams chunks from `read` into S3 and returns the object's key and size.
+
+    Small payloads go up in a single PUT. Larger ones use a multipart upload with at
+    most `parallelism` parts in flight, which also bounds memory to roughly
+    `parallelism * part_size`. Every PUT and part carries its SHA-256, so S3 rejects
+    anything corrupted on the way.
+    """
+    part_size = max(part_size, MIN_PART_SIZE)
+    size = 0
+
+    async def read_part() -> bytes:
+        nonlocal size
+        buffer = bytearray()
+        while len(buffer) < part_size:
+            chunk = await read(part_size - len(buffer))
+            if not chunk:
+                break
+            buffer.extend(chunk)
+        size += len(buffer)
+        return bytes(buffer)
+
+    part = await read_part()
+    if len(part) < part_size:
+        await asyncio.to_thread(
+            s3_client.put_object, Bucket=bucket, Key=key, Body=part,
+            ChecksumAlgorithm="SHA256", ChecksumSHA256=checksum(part),
+        )
+        return {"key": key, "size": size}
+
+    upload_id = (await asyncio.to_thread(
+        s3_client.create_multipart_upload, Bucket=bucket, Key=key, ChecksumAlgorithm="SHA256"
+    ))["UploadId"]
+    slots = asyncio.Semaphore(parallelism)
+    tasks = []
+
+    async def upload_part(number: int, body: bytes) -> dict:
+        try:
+            part_checksum = await asyncio.to_thread(checksum, body)
+            response = await asyncio.to_thread(
+                s3_client.upload_part, Bucket=bucket, Key=key, UploadId=upload_id, PartNumber=number, Body=body,
+                ChecksumAlgorithm="SHA256", ChecksumSHA256=part_checksum,
+            )
+            return {"PartNumber": number, "ETag": response["ETag"], "ChecksumSHA256": part_checksum}
+        finally:
+            slots.release()
+
+    try:
+        number = 1
+        while part:
+            await slots.acquire()
+            tasks.append(asyncio.ensure_future(upload_part(number, part)))
+            number += 1
+            part = await read_part()
+        parts = await asyncio.gather(*tasks)
+        await asyncio.to_thread(
+            s3_client.complete_multipart_upload,
+            Bucket=bucket, Key=key, UploadId=upload_id, MultipartUpload={"Parts": list(parts)},
+        )
+    except BaseException:
+        logger.error(f"Multipart upload of {key} failed, aborting")
+        for task in tasks:
+            task.cancel()
+        await asyncio.to_thread(s3_client.abort_multipart_upload, Bucket=bucket, Key=key, UploadId=upload_id)
+        raise
+
+    return {"key": key, "size": size}
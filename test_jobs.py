@@ -0,0 +1,26 @@
+import asyncio
+
+from jobs import JobManager
+
+
+def test_watch_reports_every_stage_change():
+    async def run():
+        manager = JobManager(workers=1)
+
+        async def transcribe(job):
+            job.result["transcript"] = "hello"
+
+        async def analyze(job):
+            await asyncio.sleep(0.05)
+            job.result["candidate_response"] = "hi"
+
+        job = await manager.submit([("transcribe", transcribe), ("analyze", analyze)])
+        return [state async for state in manager.watch(job.id)]
+
+    states = asyncio.run(run())
+    stages = [{name: stage["status"] for name, stage in state["stages"].items()} for state in states]
+    assert {"transcribe": "completed", "analyze": "running"} in stages
+    # The transcript is visible before the job finishes (what /jobs/{id}/speech relies on)
+    assert any(state["status"] == "running" and state["result"] == {"transcript": "hello"} for state in states)
+    assert states[-1]["status"] == "completed"
+    assert states[-1]["result"] == {"transcript": "hello", "candidate_response": "hi"}
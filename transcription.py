@@ -0,0 +1,383 @@
+import asyncio
+import base64
+import functools
+import io
+import json
+import os
+import random
+import re
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, List, Optional
+from urllib.parse import unquote_plus, urlparse
+
+import requests
+from fastapi import HTTPException
+from agno.utils.log import logger
+
+from metrics import span
+
+
+def fetch_transcript(transcript_url: str, timeout: float = 30) -> str:
+    """Downloads the Transcribe output JSON and returns the transcript text."""
+    try:
+        transcript_response = requests.get(transcript_url, timeout=timeout)
+        transcript_response.raise_for_status()
+        transcript_data = transcript_response.json()
+        return transcript_data["results"]["transcripts"][0]["transcript"]
+    except (requests.RequestException, ValueError, KeyError, IndexError) as e:
+        logger.error(f"Could not fetch transcript from {transcript_url.split('?')[0]}: {e}")
+        raise HTTPException(status_code=502, detail="Could not fetch the transcript.")
+
+
+class TranscriptionJobGone(HTTPException):
+    """Transcribe reported the job FAILED or doesn't know it; waiting on that job name again can't succeed."""
+
+    error_code = "transcription_job_gone"
+
+
+class TranscriptionWaiter:
+    """Waits for many Transcribe jobs from a single background poller.
+
+    Every pending job gets its own backoff schedule, so fresh jobs are checked
+    quickly and long-running ones are polled less and less often. Callers waiting
+    on the same job share one future. Completion notifications (SNS / EventBridge /
+    S3 events) only need to call `poke` to get the job checked right away.
+
+    A job Transcribe still doesn't know after `not_found_grace` seconds fails with a
+    404. A job nobody waits for any more (all callers timed out or went away) is
+    no longer polled.
+
+    With several worker processes, a notification can land on a worker that isn't
+    waiting for the job. `notify` also records it in the `shared` store (see
+    job_store.py), which every waiter checks every `shared_interval` seconds.
+    """
+
+    def __init__(self, transcribe_client, min_interval: float = 1.0, max_interval: float = 15.0,
+                 backoff: float = 1.5, not_found_grace: float = 30.0, shared=None, shared_interval: float = 1.0):
+        self.transcribe_client = transcribe_client
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self.backoff = backoff
+        self.not_found_grace = not_found_grace
+        self.shared = shared
+        self.shared_interval = shared_interval
+        self._next_shared_check = 0.0
+        self._poke_seen: Dict[str, float] = {}
+        self._futures: Dict[str, asyncio.Future] = {}
+        self._next_check: Dict[str, float] = {}
+        self._interval: Dict[str, float] = {}
+        self._started: Dict[str, float] = {}
+        self._waiters: Dict[str, int] = {}
+        self._wakeup: Optional[asyncio.Event] = None
+        self._task: Optional[asyncio.Task] = None
+
+    @property
+    def pending(self) -> int:
+        return len(self._futures)
+
+    def _ensure_poller(self):
+        if self._task is None or self._task.done():
+            self._wakeup = asyncio.Event()
+            self._task = asyncio.get_running_loop().create_task(self._poll_loop())
+
+    async def wait(self, job_name: str, timeout: Optional[float] = None) -> str:
+        """Returns the transcript text once the job completes."""
+        self._ensure_poller()
+        future = self._futures.get(job_name)
+        if future is None:
+            future = asyncio.get_running_loop().create_future()
+            self._futures[job_name] = future
+            self._interval[job_name] = self.min_interval
+            self._started[job_name] = self._next_check[job_name] = time.monotonic()
+            self._wakeup.set()
+        self._waiters[job_name] = self._waiters.get(job_name, 0) + 1
+        try:
+            with span("transcribe_wait"):
+                transcript_url = await asyncio.wait_for(asyncio.shield(future), timeout)
+        except asyncio.TimeoutError:
+            raise HTTPException(status_code=504, detail="Timed out waiting for transcription.")
+        finally:
+            self._waiters[job_name] -= 1
+            if not self._waiters[job_name]:
+                del self._waiters[job_name]
+                # Last caller gone: stop polling a job nobody is waiting for
+                if not future.done():
+                    self._forget(job_name)
+                    future.cancel()
+        with span("transcript_fetch"):
+            return await asyncio.to_thread(fetch_transcript, transcript_url)
+
+    def poke(self, job_name: str):
+        """Schedules an immediate status check, e.g. after a completion notification."""
+        if job_name in self._futures:
+            self._next_check[job_name] = 0
+            if self._wakeup is not None:
+                self._wakeup.set()
+
+    async def notify(self, job_names: List[str]):
+        """Handles a completion notification, whichever worker process is waiting for the jobs."""
+        for job_name in job_names:
+            self.poke(job_name)
+        if self.shared is not None and job_names:
+            await asyncio.to_thread(self.shared.poke, job_names)
+
+    async def _check_shared(self):
+        try:
+            poked = await asyncio.to_thread(self.shared.pokes, list(self._futures))
+        except Exception as e:
+            logger.warning(f"Could not read transcription notifications from the shared store: {e}")
+            return
+        for job_name, poked_at in poked.items():
+            if poked_at > self._poke_seen.get(job_name, 0):
+                self._poke_seen[job_name] = poked_at
+                self.poke(job_name)
+
+    def _forget(self, job_name: str) -> Optional[asyncio.Future]:
+        self._poke_seen.pop(job_name, None)
+        self._next_check.pop(job_name, None)
+        self._interval.pop(job_name, None)
+        self._started.pop(job_name, None)
+        return self._futures.pop(job_name, None)
+
+    def _resolve(self, job_name: str, transcript_url: Optional[str] = None, error: Optional[Exception] = None):
+        future = self._forget(job_name)
+        if future is None or future.done():
+            return
+        if error is not None:
+            future.set_exception(error)
+        else:
+            future.set_result(transcript_url)
+
+    async def _check(self, job_name: str):
+        try:
+            response = await asyncio.to_thread(
+                self.transcribe_client.get_transcription_job, TranscriptionJobName=job_name
+            )
+        except Exception as e:
+            error = getattr(e, "response", None)
+            error_code = error.get("Error", {}).get("Code") if isinstance(error, dict) else None
+            # Transcribe reports unknown jobs as BadRequest; right after the upload it may just not be started yet
+            waited = time.monotonic() - self._started.get(job_name, time.monotonic())
+            if error_code in ("BadRequestException", "NotFoundException") and waited >= self.not_found_grace:
+                self._resolve(job_name, error=TranscriptionJobGone(status_code=404, detail="Transcription job not found."))
+                return
+            logger.warning(f"Transcription status check failed for {job_name}: {e}")
+            response = None
+
+        if response is not None:
+            job = response["TranscriptionJob"]
+            status = job["TranscriptionJobStatus"]
+            if status == "COMPLETED":
+                self._resolve(job_name, transcript_url=job["Transcript"]["TranscriptFileUri"])
+                return
+            if status == "FAILED":
+                self._resolve(job_name, error=TranscriptionJobGone(status_code=500, detail="Transcription job failed."))
+                return
+
+        # Still running (or the check errored): back off with jitter.
+        if job_name in self._interval:
+            interval = min(self._interval[job_name] * self.backoff, self.max_interval)
+            self._interval[job_name] = interval
+            self._next_check[job_name] = time.monotonic() + interval * random.uniform(0.8, 1.2)
+
+    async def _poll_loop(self):
+        while True:
+            self._wakeup.clear()
+            now = time.monotonic()
+            if self.shared is not None and self._futures and now >= self._next_shared_check:
+                self._next_shared_check = now + self.shared_interval
+                await self._check_shared()
+                now = time.monotonic()
+            due = [name for name, at in self._next_check.items() if at <= now]
+            if due:
+                await asyncio.gather(*(self._check(name) for name in due))
+                continue
+
+            if self._next_check:
+                delay = max(min(self._next_check.values()) - now, 0)
+                if self.shared is not None:
+                    delay = min(delay, max(self._next_shared_check - now, 0))
+            else:
+                delay = None
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), delay)
+            except asyncio.TimeoutError:
+                pass
+
+
+# SNS signs messages with certificates served from these hosts only
+SNS_HOST = re.compile(r"sns\.[a-z0-9-]+\.amazonaws\.com(\.cn)?")
+SNS_SIGNED_FIELDS = {
+    "Notification": ("Message", "MessageId", "Subject", "Timestamp", "TopicArn", "Type"),
+    "SubscriptionConfirmation": ("Message", "MessageId", "SubscribeURL", "Timestamp", "Token", "TopicArn", "Type"),
+}
+
+
+def is_sns_url(url: str) -> bool:
+    parsed = urlparse(url or "")
+    return parsed.scheme == "https" and bool(SNS_HOST.fullmatch(parsed.hostname or ""))
+
+
+@functools.lru_cache(maxsize=16)
+def sns_certificate(url: str):
+    from cryptography import x509
+
+    response = requests.get(url, timeout=10)
+    response.raise_for_status()
+    return x509.load_pem_x509_certificate(response.content)
+
+
+def verify_sns_message(payload: dict) -> bool:
+    """Checks an SNS message's signature against its AWS signing certificate.
+
+    Requires the `cryptography` package.
+    """
+    from cryptography.exceptions import InvalidSignature
+    from cryptography.hazmat.primitives import hashes
+    from cryptography.hazmat.primitives.asymmetric import padding
+
+    fields = SNS_SIGNED_FIELDS.get(payload.get("Type"))
+    if fields is None or not is_sns_url(payload.get("SigningCertURL")):
+        return False
+    signed = "".join(f"{field}\n{payload[field]}\n" for field in fields if field in payload)
+    algorithm = hashes.SHA256() if payload.get("SignatureVersion") == "2" else hashes.SHA1()
+    try:
+        sns_certificate(payload["SigningCertURL"]).public_key().verify(
+            base64.b64decode(payload.get("Signature", "")), signed.encode("utf-8"), padding.PKCS1v15(), algorithm
+        )
+    except (InvalidSignature, ValueError, requests.RequestException) as e:
+        logger.warning(f"Rejected SNS message {payload.get('MessageId')}: {e}")
+        return False
+    return True
+
+
+def job_names_from_event(payload: dict) -> list:
+    """Extracts Transcribe job names from an SNS, EventBridge or S3 event payload."""
+    if payload.get("Type") == "Notification" and "Message" in payload:
+        try:
+            payload = json.loads(payload["Message"])
+        except (TypeError, ValueError):
+            return []
+
+    # EventBridge "Transcribe Job State Change"
+    detail = payload.get("detail")
+    if isinstance(detail, dict) and detail.get("TranscriptionJobName"):
+        return [detail["TranscriptionJobName"]]
+
+    # S3 ObjectCreated for the transcript output ("<job_name>.json")
+    job_names = []
+    for record in payload.get("Records", []):
+        key = unquote_plus(record.get("s3", {}).get("object", {}).get("key", ""))
+        if key.endswith(".json"):
+            job_names.append(key.rsplit("/", 1)[-1][:-len(".json")])
+    return job_names
+
+
+class TranscriptionBackend:
+    """Turns a recording into text. `audio` is only passed to backends that decode locally."""
+
+    name = "base"
+
+    async def transcribe(self, job_name: str, audio: Optional[bytes] = None) -> str:
+        raise NotImplementedError
+
+    def close(self):
+        pass
+
+
+class AwsTranscribeBackend(TranscriptionBackend):
+    """AWS Transcribe: the job is started from the S3 upload, we only wait for its result."""
+
+    name = "aws"
+
+    def __init__(self, waiter: TranscriptionWaiter, timeout: Optional[float] = None):
+        self.waiter = waiter
+        self.timeout = timeout
+
+    async def transcribe(self, job_name: str, audio: Optional[bytes] = None) -> str:
+        return await self.waiter.wait(job_name, timeout=self.timeout)
+
+
+# Per-process Whisper model, loaded once by the pool initializer
+_whisper_model = None
+
+
+def _load_whisper(model_size: str, compute_type: str, cpu_threads: int):
+    global _whisper_model
+    from faster_whisper import WhisperModel
+    _whisper_model = WhisperModel(model_size, device="cpu", compute_type=compute_type, cpu_threads=cpu_threads)
+
+
+def _transcribe_samples(samples, language: Optional[str], beam_size: int) -> str:
+    segments, _ = _whisper_model.transcribe(samples, language=language, beam_size=beam_size, vad_filter=True)
+    return " ".join(segment.text.strip() for segment in segments)
+
+
+class LocalWhisperBackend(TranscriptionBackend):
+    """Offline transcription with faster-whisper (CTranslate2) in a process pool.
+
+    Recordings are decoded to 16 kHz mono and cut into windows of about
+    `chunk_seconds`, at quiet points so words aren't split, that are transcribed
+    in parallel, one model per worker process, then joined in order.
+    Requires the optional `faster-whisper` package.
+    """
+
+    name = "local"
+    SAMPLE_RATE = 16000
+
+    def __init__(self, model_size: str = "base.en", workers: int = 2, chunk_seconds: float = 30,
+                 compute_type: str = "int8", language: Optional[str] = "en", beam_size: int = 1):
+        self.model_size = model_size
+        self.workers = workers
+        self.chunk_seconds = chunk_seconds
+        self.compute_type = compute_type
+        self.language = language
+        self.beam_size = beam_size
+        self._pool = None
+
+    def _get_pool(self):
+        if self._pool is None:
+            cpu_threads = max(1, (os.cpu_count() or 1) // self.workers)
+            self._pool = ProcessPoolExecutor(
+                max_workers=self.workers,
+                initializer=_load_whisper,
+                initargs=(self.model_size, self.compute_type, cpu_threads),
+            )
+        return self._pool
+
+    def _decode(self, audio: bytes):
+        try:
+            from faster_whisper import decode_audio
+        except ImportError:
+            raise HTTPException(status_code=500, detail="Local transcription needs the faster-whisper package.")
+        return decode_audio(io.BytesIO(audio), sampling_rate=self.SAMPLE_RATE)
+
+    async def transcribe_samples(self, samples) -> str:
+        """Transcribes one window of 16 kHz mono float32 samples on the pool."""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._get_pool(), _transcribe_samples, samples, self.language, self.beam_size)
+
+    async def transcribe(self, job_name: str, audio: Optional[bytes] = None) -> str:
+        if audio is None:
+            raise HTTPException(status_code=404, detail="Transcript not available yet.")
+        from live import quiet_cut
+
+        with span("audio_decode"):
+            samples = await asyncio.to_thread(self._decode, audio)
+        # Cut at the quietest point near each boundary rather than mid-word
+        step = int(self.chunk_seconds * self.SAMPLE_RATE)
+        chunks = []
+        while len(samples) > step:
+            cut = quiet_cut(samples, step)
+            chunks.append(samples[:cut])
+            samples = samples[cut:]
+        chunks.append(samples)
+        with span("whisper_transcribe", chunks=len(chunks)):
+            texts = await asyncio.gather(*(self.transcribe_samples(chunk) for chunk in chunks))
+        return " ".join(text for text in texts if text)
+
+    def close(self):
+        if self._pool is not None:
+            self._pool.shutdown(wait=False, cancel_futures=True)
+            self._pool = None
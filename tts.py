@@ -0,0 +1,157 @@
+import asyncio
+import hashlib
+import os
+import re
+import threading
+import uuid
+from typing import AsyncIterator, List, Optional, Tuple
+
+from agno.utils.log import logger
+
+from metrics import span
+
+MEDIA_TYPES = {".mp3": "audio/mpeg", ".wav": "audio/wav"}
+
+
+def speech_key(text: str, lang: str = "en", voice: str = "com") -> str:
+    """Content hash identifying one rendering of `text`."""
+    return hashlib.sha256(f"{lang}\0{voice}\0{text}".encode("utf-8")).hexdigest()
+
+
+class SpeechRenderer:
+    """Renders text to speech into a size-bounded, content-addressed disk cache.
+
+    Renderings are stored as `<key>.mp3` (gTTS) or `<key>.wav` (local pyttsx3
+    fallback), so identical answers are only synthesized once and concurrent
+    requests never share an output file. Least recently used files are evicted
+    once the cache grows past `max_bytes`, down to 90% of it. The size is tracked
+    as files are added, so the directory is only scanned when eviction is due.
+    """
+
+    def __init__(self, cache_dir: str, max_bytes: int = 512 * 1024 * 1024, gtts_timeout: float = 10,
+                 fallback_engine=None):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self.gtts_timeout = gtts_timeout
+        self.fallback_engine = fallback_engine
+        # pyttsx3 engines are not thread-safe
+        self._engine_lock = threading.Lock()
+        # Bytes in the cache as of the last scan plus what this process added since (None until the first scan)
+        self._size: Optional[int] = None
+        self._size_lock = threading.Lock()
+        os.makedirs(cache_dir, exist_ok=True)
+
+    def lookup(self, key: str) -> Optional[str]:
+        """Returns the cached file for `key`, if any, marking it as recently used."""
+        for extension in MEDIA_TYPES:
+            path = os.path.join(self.cache_dir, key + extension)
+            if os.path.exists(path):
+                try:
+                    os.utime(path)
+                except OSError:
+                    pass
+                return path
+        return None
+
+    def render(self, text: str, lang: str = "en", voice: str = "com", fallback: bool = True) -> Tuple[str, str]:
+        """Returns (key, path) of the rendering, synthesizing it if it isn't cached yet."""
+        key = speech_key(text, lang, voice)
+        path = self.lookup(key)
+        if path is not None and (fallback or path.endswith(".mp3")):
+            return key, path
+
+        from gtts import gTTS
+
+        # Write to a private temp name, then rename, so readers never see partial files
+        tmp_path = os.path.join(self.cache_dir, f".{key}.{uuid.uuid4().hex}.tmp")
+        try:
+            try:
+                # `voice` selects the gTTS accent (Google Translate top-level domain)
+                with span("tts_gtts", chars=len(text)):
+                    gTTS(text=text, lang=lang, tld=voice, timeout=self.gtts_timeout).save(tmp_path)
+                path = os.path.join(self.cache_dir, key + ".mp3")
+            except Exception as e:
+                if self.fallback_engine is None or not fallback:
+                    raise
+                logger.warning(f"gTTS failed, falling back to local TTS engine: {e}")
+                with self._engine_lock, span("tts_local", chars=len(text)):
+                    self.fallback_engine.save_to_file(text, tmp_path)
+                    self.fallback_engine.runAndWait()
+                path = os.path.join(self.cache_dir, key + ".wav")
+            os.replace(tmp_path, path)
+        finally:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+
+        self._added(path)
+        return key, path
+
+    def _added(self, path: str):
+        try:
+            size = os.path.getsize(path)
+        except OSError:
+            size = 0
+        with self._size_lock:
+            if self._size is not None:
+                self._size += size
+                if self._size <= self.max_bytes:
+                    return
+            self._evict()
+
+    def _evict(self):
+        entries = []
+        for name in os.listdir(self.cache_dir):
+            if name.startswith("."):
+                continue
+            try:
+                stat = os.stat(os.path.join(self.cache_dir, name))
+            except OSError:
+                continue
+            entries.append((stat.st_mtime, stat.st_size, name))
+
+        total = sum(size for _, size, _ in entries)
+        # Evicting below the limit leaves headroom, so a full cache isn't rescanned on every render
+        target = self.max_bytes * 0.9 if total > self.max_bytes else self.max_bytes
+        for _, size, name in sorted(entries):
+            if total <= target:
+                break
+            try:
+                os.remove(os.path.join(self.cache_dir, name))
+                total -= size
+            except OSError:
+                pass
+        # Also picks up what other worker processes added in the meantime
+        self._size = total
+
+
+def split_sentences(text: str) -> List[str]:
+    """Splits text into sentences on terminal punctuation."""
+    return [sentence for sentence in re.split(r"(?<=[.!?])\s+", text.strip()) if sentence]
+
+
+async def stream_speech(renderer: SpeechRenderer, text: str, lang: str = "en", voice: str = "com",
+                        workers: int = 4) -> AsyncIterator[bytes]:
+    """Yields MP3 audio sentence by sentence, in order, as soon as each one is ready.
+
+    Sentences are synthesized by up to `workers` threads in parallel (and cached
+    like any other rendering). Only gTTS is used here: MP3 frames can be
+    concatenated into one playable stream, fallback WAV files cannot.
+    """
+    slots = asyncio.Semaphore(workers)
+
+    def read(path: str) -> bytes:
+        with open(path, "rb") as f:
+            return f.read()
+
+    async def render(sentence: str) -> bytes:
+        async with slots:
+            _, path = await asyncio.to_thread(renderer.render, sentence, lang, voice, False)
+            return await asyncio.to_thread(read, path)
+
+    tasks = [asyncio.ensure_future(render(sentence)) for sentence in split_sentences(text)]
+    try:
+        for task in tasks:
+            yield await task
+    finally:
+        for task in tasks:
+            task.cancel()